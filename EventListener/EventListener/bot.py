@@ -1,23 +1,73 @@
 import asyncio
 
 
-from data.vrchatapi import login_vrc, ensure_connection, fetch_vrc_events
+from data.vrchatapi import login_all, ensure_connection, fetch_vrc_events
 from data.bot_function import command_listener
+from data.outbox import outbox, outbox_worker
+from data.event_store import get_event_store
+from data.pipeline import pipeline_listener
+from data.reconcile import reconcile_loop
+from data.scheduler import scheduler
+from data.snapshot import load_snapshot, save_snapshot
+from data.metrics import start_metrics_server
+from data.logger import get_logger, setup_logging, stop_logging
+from data import workers
+from data.executors import shutdown_executors
+import data.env_config as config
+
+
+log = get_logger("System")
 
 
 async def main():
-    await login_vrc()
-    asyncio.create_task(ensure_connection())
+    setup_logging()
+    start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+    await login_all()
+    # groups polled recently before the restart keep their schedule instead of all polling now
+    load_snapshot()
 
     async def fetch_loop():
         while True:
-            await fetch_vrc_events()
-            await asyncio.sleep(900)
+            due = scheduler.due_groups(config.GROUP_IDS)
+            if due:
+                try:
+                    results = await fetch_vrc_events(due)
+                    scheduler.record_results(results)
+                except Exception:
+                    log.exception("Sweep failed")
+                    # back off like a failed fetch instead of retrying every second
+                    scheduler.record_results({gid: {"ok": False, "changed": False, "next_start": None} for gid in due})
+                save_snapshot()
+            await asyncio.sleep(scheduler.sleep_time())
+
+    tasks = [
+        asyncio.create_task(ensure_connection()),
+        asyncio.create_task(pipeline_listener()),
+        asyncio.create_task(outbox_worker()),
+        asyncio.create_task(reconcile_loop()),
+        asyncio.create_task(fetch_loop()),
+    ]
+    try:
+        await command_listener()
+    finally:
+        await shutdown(tasks)
+
+
+async def shutdown(tasks):
+    """Stop the background tasks and worker processes, then flush state to disk."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    workers.stop()
+    shutdown_executors()
+    outbox.save()
+    store = get_event_store()
+    store.save()
+    save_snapshot()
+    store.close()
+    stop_logging()
 
-    await asyncio.gather(
-        fetch_loop(),
-        command_listener()
-    )
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
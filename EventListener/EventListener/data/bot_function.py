@@ -1,16 +1,23 @@
-import asyncio, os
-
-
 from data.extra import ts, reload_env
 from data.website.groups import add_group_to_api, update_group_on_api, delete_group_on_api
 from data.website.events import add_event_to_api, update_event_on_api, delete_event_on_api
-from data.vrchatapi import fetch_group_info, fetch_vrc_events, join_group, is_in_group
-import data.env_config as config
+from data.vrchatapi import fetch_group_info, fetch_vrc_events, join_group, member_session, invalidate_group, clear_caches, cache_stats
+from data.group_sync import sync_groups
+from data.reconcile import reconcile_website
+from data.outbox import outbox
+from data.scheduler import scheduler
+from data.metrics import print_stats
+from data.executors import console_input
+from data.logger import get_logger, set_level
+
+
+log = get_logger("System")
+outbox_log = get_logger("Outbox")
 
 
 async def command_listener():
     while True:
-        command_line = await asyncio.get_event_loop().run_in_executor(None, input, "> ")
+        command_line = await console_input.command()
         parts = command_line.strip().split(" ")
         if not parts:
             continue
@@ -27,21 +34,30 @@ async def command_listener():
             print("  add_group <vrc_group_id>")
             print("  update_group <vrc_group_id>")
             print("  delete_group <vrc_group_id>")
+            print("  sync_groups [delete]")
             print()
             print("  add_event <group_id> <event_id> <name> <description> <starts_at> <ends_at> <category> <access_type> <platforms>")
             print("  update_event <event_id> <group_id> <event_id> <name> <description> <starts_at> <ends_at> <category> <access_type> <platforms> <image_url> <tags>")
             print("  delete_event <event_id>")
             print()
+            print("  outbox")
+            print("  replay_dead_letters")
+            print()
             print("  reload_env")
             print("  refetch")
+            print("  reconcile")
+            print("  schedule")
+            print("  cache [clear]")
+            print("  log_level <debug|info|warning|error>")
+            print("  stats")
             print("  exit / quit")
             continue
 
 
 # exit/quit
         elif command in ("exit", "quit"):
-            print(f"{ts()} [System] Exiting...")
-            os._exit(0)
+            log.info("Exiting...")
+            return
 
 
 # reload_env
@@ -49,8 +65,8 @@ async def command_listener():
             if len(parts) > 1:
                 reload_env(*parts[1:])
             else:
-                print(f"{ts()} [System] Error: reload_env requires at least one argument.")
-                print(f"{ts()} [System] Usage: reload_env api_key|group_ids|endpoints")
+                log.error("reload_env requires at least one argument.")
+                log.info("Usage: reload_env api_key|group_ids|endpoints")
 
 
 # Groups
@@ -62,9 +78,9 @@ async def command_listener():
 
             result = await join_group(group_id)
             if result:
-                print(f"{ts()} [System] Joined group {group_id} successfully.")
+                log.info("Joined group %s successfully.", group_id)
             else:
-                print(f"{ts()} [System] Join group request failed.")
+                log.warning("Join group request failed.")
             continue
 
 
@@ -72,25 +88,25 @@ async def command_listener():
         elif command == "add_group" and len(parts) == 2:
             group_id = parts[1]
 
-            in_group = await is_in_group(group_id)
-            if not in_group:
-                print(f"{ts()} [System] Cannot add {group_id}: bot ({config.user_id}) is not a member of this group.")
-                print(f"{ts()} [System] Run: join_group {group_id}")
+            if await member_session(group_id) is None:
+                log.warning("Cannot add %s: no bot account is a member of this group.", group_id)
+                log.info("Run: join_group %s", group_id)
                 continue
 
             info = await fetch_group_info(group_id)
 
             if info:
                 await add_group_to_api(info["id"], info["name"])
-                print(f"{ts()} [System] Added group {info['name']} ({info['id']}) to API.")
+                log.info("Added group %s (%s) to API.", info['name'], info['id'])
             else:
-                print(f"{ts()} [System] Failed to get group info for {group_id}")
+                log.warning("Failed to get group info for %s", group_id)
             continue
 
 
 # update_group
         elif command == "update_group" and len(parts) == 2:
             group_id = parts[1]
+            invalidate_group(group_id)
             info = await fetch_group_info(group_id)
 
             if info:
@@ -99,7 +115,7 @@ async def command_listener():
                     info["name"]
                 )
             else:
-                print(f"{ts()} [System] Failed to get group info for {group_id}")
+                log.warning("Failed to get group info for %s", group_id)
             continue
 
 
@@ -110,12 +126,78 @@ async def command_listener():
             continue
 
 
+# sync_groups
+        elif command == "sync_groups" and len(parts) <= 2:
+            delete = len(parts) == 2 and parts[1].lower() == "delete"
+            if len(parts) == 2 and not delete:
+                log.warning("Usage: sync_groups [delete]")
+                continue
+            await sync_groups(delete=delete)
+            continue
+
+
 # Events
 
 
 # refetch
         elif command == "refetch":
-            await fetch_vrc_events()
+            results = await fetch_vrc_events()
+            scheduler.record_results(results)
+            continue
+
+
+# reconcile
+        elif command == "reconcile":
+            await reconcile_website()
+            continue
+
+
+# cache
+        elif command == "cache":
+            if len(parts) > 1 and parts[1].lower() == "clear":
+                clear_caches()
+                log.info("Cleared VRChat response caches.")
+            else:
+                for name, stats in cache_stats().items():
+                    print(f"  {name}: {stats['size']} entries, {stats['hits']} hits, {stats['misses']} misses, {stats['revalidated']} revalidated")
+            continue
+
+
+# log_level
+        elif command == "log_level" and len(parts) == 2:
+            if set_level(parts[1]):
+                log.info("Log level set to %s.", parts[1].upper())
+            else:
+                log.error("Unknown log level %s.", parts[1])
+            continue
+
+
+# stats
+        elif command == "stats":
+            print_stats()
+            continue
+
+
+# schedule
+        elif command == "schedule":
+            scheduler.describe()
+            continue
+
+
+# outbox
+        elif command == "outbox":
+            print(f"{ts()} [Outbox] {outbox.pending_count()} pending, {len(outbox.dead_letters)} dead letters.")
+            for key, item in list(outbox.dead_letters.items())[:10]:
+                print(f"  {item['op']} {key}: {item.get('last_error')}")
+            continue
+
+
+# replay_dead_letters
+        elif command == "replay_dead_letters":
+            replayed = outbox.replay_dead_letters()
+            outbox_log.info("Re-queued %s dead letters.", replayed)
+            if replayed:
+                await outbox.deliver_due()
             continue
 
 
@@ -203,4 +285,4 @@ async def command_listener():
 
 
         else:
-            print(f"{ts()} [System] Unknown command. Type 'help' for options.")
+            log.warning("Unknown command. Type 'help' for options.")
@@ -0,0 +1,79 @@
+import time
+
+
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small LRU cache whose entries go stale after `ttl` seconds.
+
+    Stale entries are kept (until evicted) together with their ETag, so callers can
+    revalidate them with If-None-Match instead of downloading the body again.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def lookup(self, key):
+        """(value, etag, fresh) for `key`, or None. Does not count as a hit or miss."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        value, etag, expires_at = entry
+        return value, etag, expires_at > time.time()
+
+    def get(self, key, default=None):
+        entry = self.lookup(key)
+        if entry is not None and entry[2]:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, etag=None, ttl=None):
+        self.entries[key] = (value, etag, time.time() + (self.ttl if ttl is None else ttl))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def touch(self, key):
+        """Mark an entry fresh again, e.g. after the upstream answered 304 Not Modified."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.revalidated += 1
+            self.set(key, entry[0], entry[1])
+
+    def expire(self, key):
+        """Mark an entry stale but keep its ETag, so the next lookup revalidates instead of refetching."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries[key] = (entry[0], entry[1], 0.0)
+
+    def expire_where(self, predicate):
+        for key in [key for key in self.entries if predicate(key)]:
+            self.expire(key)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+        }
@@ -7,11 +7,86 @@ VRC_USER = os.getenv("VRC_USER")
 VRC_PASS = os.getenv("VRC_PASS")
 user_id = os.getenv("USER_ID")
 
+# extra bot accounts that share the fetching: VRC_USER_2 / VRC_PASS_2 / USER_ID_2, then _3, ...
+VRC_ACCOUNTS = [("1", VRC_USER, VRC_PASS, user_id)]
+while os.getenv(f"VRC_USER_{len(VRC_ACCOUNTS) + 1}"):
+    n = len(VRC_ACCOUNTS) + 1
+    VRC_ACCOUNTS.append((str(n), os.getenv(f"VRC_USER_{n}"), os.getenv(f"VRC_PASS_{n}"), os.getenv(f"USER_ID_{n}")))
+# points per account on the hash ring that assigns groups to accounts
+SHARD_REPLICAS = int(os.getenv("SHARD_REPLICAS", "64"))
+# log in again this many seconds before the auth cookie expires
+REAUTH_BEFORE_EXPIRY = float(os.getenv("REAUTH_BEFORE_EXPIRY", "86400"))
+
 API_KEY = os.getenv("API_KEY")
 ENDPOINT_BASE_EVENT = os.getenv("ENDPOINT_BASE_EVENT")
 ENDPOINT_BASE_GROUP = os.getenv("ENDPOINT_BASE_GROUP")
+ENDPOINT_BULK_EVENT = os.getenv("ENDPOINT_BULK_EVENT")
 
 CONTACT = os.getenv("CONTACT")
 
 raw_ids = os.getenv("GROUP_ID", "")
 GROUP_IDS = [gid.strip() for gid in raw_ids.split(",") if gid.strip()]
+
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))
+# worker processes that fetch and parse calendars (0 = fetch in the bot process)
+FETCH_PROCESSES = int(os.getenv("FETCH_PROCESSES", "0"))
+DETAIL_CONCURRENCY = int(os.getenv("DETAIL_CONCURRENCY", "4"))
+# calendar listings are paged (VRChat allows at most 100 per page, larger values are capped);
+# once the total is known further pages load DETAIL_CONCURRENCY at a time
+CALENDAR_PAGE_SIZE = int(os.getenv("CALENDAR_PAGE_SIZE", "100"))
+# only mirror events starting within this many days, asked for month by month (0 = no limit)
+CALENDAR_HORIZON_DAYS = float(os.getenv("CALENDAR_HORIZON_DAYS", "0"))
+# fetched groups / write batches allowed to wait between sweep stages
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# seconds a sweep waits for more changes before pushing a part-filled batch
+PUSH_LINGER = float(os.getenv("PUSH_LINGER", "1"))
+
+EVENT_STORE = os.getenv("EVENT_STORE", "sqlite").strip().lower()
+EVENT_RETENTION_HOURS = float(os.getenv("EVENT_RETENTION_HOURS", "24"))
+
+WEBSITE_POOL_SIZE = int(os.getenv("WEBSITE_POOL_SIZE", "8"))
+# threads for blocking VRChat SDK calls; the website uses WEBSITE_POOL_SIZE threads
+VRC_IO_THREADS = int(os.getenv("VRC_IO_THREADS", "16"))
+WEBSITE_CONNECT_TIMEOUT = float(os.getenv("WEBSITE_CONNECT_TIMEOUT", "5"))
+WEBSITE_READ_TIMEOUT = float(os.getenv("WEBSITE_READ_TIMEOUT", "90"))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "25"))
+# groups looked up / written at once by sync_groups, deletes at once by reconcile
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+# seconds between reconcile passes over the website's event listing (0 = console only)
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "0"))
+# ended events stay on the website this long before reconcile deletes them
+WEBSITE_KEEP_ENDED_HOURS = float(os.getenv("WEBSITE_KEEP_ENDED_HOURS", "0"))
+
+# requests per second per upstream; FETCH_RATE is the older name for VRC_RATE
+VRC_RATE = float(os.getenv("VRC_RATE", os.getenv("FETCH_RATE", "2")))
+WEBSITE_RATE = float(os.getenv("WEBSITE_RATE", "2"))
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_BACKOFF = float(os.getenv("OUTBOX_BASE_BACKOFF", "30"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "3600"))
+OUTBOX_INTERVAL = float(os.getenv("OUTBOX_INTERVAL", "30"))
+
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "300"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "3600"))
+
+# realtime updates from the VRChat websocket pipeline (needs the optional `websockets` package)
+VRC_PIPELINE = os.getenv("VRC_PIPELINE", "false").strip().lower() in ("1", "true", "yes", "on")
+VRC_PIPELINE_URL = os.getenv("VRC_PIPELINE_URL", "wss://pipeline.vrchat.cloud/")
+VRC_PIPELINE_DEBOUNCE = float(os.getenv("VRC_PIPELINE_DEBOUNCE", "5"))
+
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "2048"))
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "120"))
+DETAIL_CACHE_TTL = float(os.getenv("DETAIL_CACHE_TTL", "21600"))
+GROUP_CACHE_TTL = float(os.getenv("GROUP_CACHE_TTL", "3600"))
+MEMBERSHIP_CACHE_TTL = float(os.getenv("MEMBERSHIP_CACHE_TTL", "600"))
+
+# 0 disables the /metrics endpoint
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+LOG_FILE = os.getenv("LOG_FILE")
+# response bodies in logs are cut to this many characters (0 = no limit)
+LOG_BODY_LIMIT = int(os.getenv("LOG_BODY_LIMIT", "500"))
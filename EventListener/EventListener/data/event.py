@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+
+
+from data.event_store import event_fingerprint
+
+
+WEBSITE_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_datetime(value):
+    """datetime or ISO string -> aware UTC datetime, or None if it can't be parsed."""
+    if isinstance(value, datetime):
+        dt = value
+    elif value:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class Event:
+    """
+    One VRChat calendar event, built once when it is fetched.
+
+    Dates are parsed a single time; the website payload and its fingerprint are computed
+    on first use and cached, so diffing, pushing and storing an event never rebuild them.
+    Treat instances as read-only, the caches assume the fields don't change.
+    """
+
+    __slots__ = (
+        "group_id", "event_id", "title", "description", "starts_at", "ends_at",
+        "category", "access_type", "platforms", "image_url", "tags",
+        "_payload", "_fingerprint",
+    )
+
+    def __init__(self, group_id, event_id, title, description, starts_at, ends_at, category, access_type, platforms=(), image_url=None, tags=None):
+        self.group_id = str(group_id)
+        self.event_id = str(event_id)
+        self.title = title
+        self.description = description
+        self.starts_at = parse_datetime(starts_at)
+        self.ends_at = parse_datetime(ends_at)
+        self.category = category
+        self.access_type = access_type
+        self.platforms = tuple(str(p) for p in platforms or ())
+        self.image_url = str(image_url) if image_url else None
+        self.tags = tuple(str(t) for t in tags) if tags else None
+        self._payload = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_vrchat(cls, group_id, listed, detail=None):
+        """Build from an SDK CalendarEvent; `detail` is the full lookup when the list lacked fields."""
+        detail = detail or listed
+        return cls(
+            group_id,
+            listed.id,
+            listed.title,
+            listed.description,
+            listed.starts_at,
+            listed.ends_at,
+            listed.category,
+            listed.access_type,
+            getattr(detail, "platforms", None),
+            getattr(detail, "image_url", None),
+            getattr(detail, "tags", None),
+        )
+
+    def compact(self):
+        """Plain tuple for handing the event to another process; see from_compact()."""
+        return (
+            self.event_id, self.title, self.description, self.starts_at, self.ends_at,
+            self.category, self.access_type, self.platforms, self.image_url, self.tags,
+            self.fingerprint(),
+        )
+
+    @classmethod
+    def from_compact(cls, group_id, data):
+        """Rebuild an event from compact(), keeping the fingerprint the sender already computed."""
+        event = cls(group_id, *data[:-1])
+        event._fingerprint = data[-1]
+        return event
+
+    @property
+    def key(self):
+        return (self.group_id, self.event_id)
+
+    @property
+    def starts_epoch(self):
+        return self.starts_at.timestamp() if self.starts_at else None
+
+    @property
+    def ends_epoch(self):
+        return self.ends_at.timestamp() if self.ends_at else None
+
+    def payload(self):
+        """The body the website expects (same shape and values the bot has always sent)."""
+        if self._payload is None:
+            self._payload = {
+                "vrc_group_id": self.group_id,
+                "vrc_event_id": self.event_id,
+                "name": str(self.title),
+                "description": str(self.description),
+                "starts_at": self.starts_at.strftime(WEBSITE_DATE_FORMAT) if self.starts_at else None,
+                "ends_at": self.ends_at.strftime(WEBSITE_DATE_FORMAT) if self.ends_at else None,
+                "category": str(self.category),
+                "access_type": str(self.access_type),
+                "platforms": list(self.platforms),
+                "image_url": self.image_url,
+                "tags": list(self.tags) if self.tags else None,
+            }
+        return self._payload
+
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = event_fingerprint(self.payload())
+        return self._fingerprint
+
+    def __repr__(self):
+        return f"Event({self.group_id}/{self.event_id} {self.title!r} {self.starts_at})"
@@ -0,0 +1,305 @@
+import os, json, time, hashlib, sqlite3
+
+
+from datetime import datetime, timezone
+
+
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.EVENT_STORE
+config.EVENT_RETENTION_HOURS
+
+
+log = get_logger("EventStore")
+
+
+BASE_DIR = os.path.dirname(__file__)
+LEGACY_EVENTS_FILE = os.path.join(BASE_DIR, "..", "events.txt")
+FINGERPRINTS_FILE = os.path.join(BASE_DIR, "..", "event_fingerprints.json")
+SQLITE_FILE = os.path.join(BASE_DIR, "..", "events.db")
+
+
+def event_fingerprint(payload):
+    """Stable hash of a website payload; changes whenever a mirrored field changes."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def to_epoch(value):
+    """ISO timestamp (as sent to the website) -> unix seconds, or None."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class EventStore:
+    """
+    State of every mirrored event, keyed by (group_id, event_id).
+
+    Records are dicts with "hash", "website_id", "expires_at" (the event's end, unix
+    seconds) and "last_seen". Backends only need to implement the methods below.
+    """
+
+    def get(self, group_id, event_id):
+        raise NotImplementedError
+
+    def contains(self, group_id, event_id):
+        return self.get(group_id, event_id) is not None
+
+    def put(self, group_id, event_id, fingerprint, website_id=None, expires_at=None):
+        raise NotImplementedError
+
+    def remove(self, group_id, event_id):
+        raise NotImplementedError
+
+    def mark_seen(self, group_id, event_ids):
+        raise NotImplementedError
+
+    def event_ids(self, group_id):
+        raise NotImplementedError
+
+    def fingerprints(self, group_id):
+        """{event_id: hash} of one group."""
+        return {event_id: self.get(group_id, event_id)["hash"] for event_id in self.event_ids(group_id)}
+
+    def prune_expired(self, retention_seconds):
+        """Drop events that ended more than `retention_seconds` ago. Returns how many were removed."""
+        raise NotImplementedError
+
+    def save(self):
+        pass
+
+    def close(self):
+        self.save()
+
+
+class JsonEventStore(EventStore):
+    """Whole-file JSON backend; fine for a handful of groups, loads everything into memory."""
+
+    def __init__(self, path=FINGERPRINTS_FILE):
+        self.path = path
+        self.records = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.records = json.load(f)
+            except (OSError, ValueError) as ex:
+                log.warning("Could not read %s, starting empty: %s", path, ex)
+
+        for group in self.records.values():
+            for record in group.values():
+                if "ends_at" in record:
+                    record["expires_at"] = to_epoch(record.pop("ends_at"))
+                record.setdefault("last_seen", None)
+
+    def get(self, group_id, event_id):
+        return self.records.get(group_id, {}).get(event_id)
+
+    def put(self, group_id, event_id, fingerprint, website_id=None, expires_at=None):
+        previous = self.get(group_id, event_id) or {}
+        self.records.setdefault(group_id, {})[event_id] = {
+            "hash": fingerprint,
+            "website_id": website_id if website_id is not None else previous.get("website_id"),
+            "expires_at": expires_at if expires_at is not None else previous.get("expires_at"),
+            "last_seen": time.time(),
+        }
+
+    def remove(self, group_id, event_id):
+        group = self.records.get(group_id, {})
+        group.pop(event_id, None)
+        if not group:
+            self.records.pop(group_id, None)
+
+    def mark_seen(self, group_id, event_ids):
+        now = time.time()
+        group = self.records.get(group_id, {})
+        for event_id in event_ids:
+            if event_id in group:
+                group[event_id]["last_seen"] = now
+
+    def event_ids(self, group_id):
+        return list(self.records.get(group_id, {}))
+
+    def prune_expired(self, retention_seconds):
+        cutoff = time.time() - retention_seconds
+        expired = [
+            (group_id, event_id)
+            for group_id, group in self.records.items()
+            for event_id, record in group.items()
+            if record.get("expires_at") is not None and record["expires_at"] < cutoff
+        ]
+        for group_id, event_id in expired:
+            self.remove(group_id, event_id)
+        return len(expired)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.records, f)
+        os.replace(tmp, self.path)
+
+
+class SqliteEventStore(EventStore):
+    """Indexed SQLite backend; lookups and pruning never load the whole history."""
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                group_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                website_id TEXT,
+                content_hash TEXT,
+                last_seen REAL,
+                expires_at REAL,
+                PRIMARY KEY (group_id, event_id)
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS events_expires_at ON events (expires_at)")
+        self.conn.commit()
+
+    def get(self, group_id, event_id):
+        row = self.conn.execute(
+            "SELECT content_hash, website_id, expires_at, last_seen FROM events WHERE group_id = ? AND event_id = ?",
+            (group_id, event_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"hash": row[0], "website_id": row[1], "expires_at": row[2], "last_seen": row[3]}
+
+    def put(self, group_id, event_id, fingerprint, website_id=None, expires_at=None):
+        self.conn.execute(
+            """
+            INSERT INTO events (group_id, event_id, website_id, content_hash, last_seen, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (group_id, event_id) DO UPDATE SET
+                website_id = COALESCE(excluded.website_id, events.website_id),
+                content_hash = excluded.content_hash,
+                last_seen = excluded.last_seen,
+                expires_at = COALESCE(excluded.expires_at, events.expires_at)
+            """,
+            (group_id, event_id, website_id, fingerprint, time.time(), expires_at),
+        )
+
+    def remove(self, group_id, event_id):
+        self.conn.execute("DELETE FROM events WHERE group_id = ? AND event_id = ?", (group_id, event_id))
+
+    def mark_seen(self, group_id, event_ids):
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE events SET last_seen = ? WHERE group_id = ? AND event_id = ?",
+            [(now, group_id, event_id) for event_id in event_ids],
+        )
+
+    def event_ids(self, group_id):
+        rows = self.conn.execute("SELECT event_id FROM events WHERE group_id = ?", (group_id,))
+        return [row[0] for row in rows]
+
+    def fingerprints(self, group_id):
+        rows = self.conn.execute("SELECT event_id, content_hash FROM events WHERE group_id = ?", (group_id,))
+        return dict(rows)
+
+    def prune_expired(self, retention_seconds):
+        cursor = self.conn.execute("DELETE FROM events WHERE expires_at < ?", (time.time() - retention_seconds,))
+        return cursor.rowcount
+
+    def save(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def migrate_legacy_files(store):
+    """
+    One-shot import of events.txt (and the old fingerprint JSON) into `store`.
+
+    Migrated files are renamed with a .migrated suffix so this only ever runs once.
+    """
+    imported = 0
+
+    if isinstance(store, SqliteEventStore) and os.path.exists(FINGERPRINTS_FILE):
+        legacy = JsonEventStore(FINGERPRINTS_FILE)
+        for group_id, group in legacy.records.items():
+            for event_id, record in group.items():
+                store.put(group_id, event_id, record["hash"], record.get("website_id"), record.get("expires_at"))
+                imported += 1
+        store.save()
+        os.replace(FINGERPRINTS_FILE, f"{FINGERPRINTS_FILE}.migrated")
+
+    if os.path.exists(LEGACY_EVENTS_FILE):
+        with open(LEGACY_EVENTS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                event_id, sep, group_id = line.strip().partition(" from ")
+                if not sep or store.contains(group_id, event_id):
+                    continue
+                # no hash yet: the next sweep refreshes it without posting the event again
+                store.put(group_id, event_id, None)
+                imported += 1
+        store.save()
+        os.replace(LEGACY_EVENTS_FILE, f"{LEGACY_EVENTS_FILE}.migrated")
+
+    if imported:
+        log.info("Migrated %s events into %s.", imported, type(store).__name__)
+    return imported
+
+
+_store = None
+
+
+def get_event_store():
+    """Open the configured backend once per process (EVENT_STORE=sqlite|json)."""
+    global _store
+    if _store is None:
+        if config.EVENT_STORE == "json":
+            _store = JsonEventStore()
+        else:
+            _store = SqliteEventStore()
+        migrate_legacy_files(_store)
+    return _store
+
+
+def diff_group_events(store, group_id, fingerprints, horizon=None):
+    """
+    Compare a freshly fetched group against the store.
+
+    `fingerprints` maps event_id -> event_fingerprint of its website payload. Returns (creates, updates, deletes, ended):
+    creates/updates are lists of event ids, deletes is a list of (event_id, website_id) for
+    events that vanished before ending, ended lists event ids that simply finished.
+    With a `horizon` (unix seconds) the fetch left out later events, so stored events that
+    end after it are neither deleted nor ended.
+    """
+    now = datetime.now(timezone.utc).timestamp()
+    creates, updates, deletes, ended = [], [], [], []
+
+    for event_id, fingerprint in fingerprints.items():
+        record = store.get(group_id, event_id)
+        if record is None:
+            creates.append(event_id)
+        elif record["hash"] != fingerprint:
+            updates.append(event_id)
+
+    for event_id in store.event_ids(group_id):
+        if event_id in fingerprints:
+            continue
+
+        record = store.get(group_id, event_id)
+        if record.get("expires_at") is not None and record["expires_at"] < now:
+            ended.append(event_id)
+        elif horizon is not None and record.get("expires_at") is not None and record["expires_at"] > horizon:
+            continue
+        else:
+            deletes.append((event_id, record.get("website_id")))
+
+    return creates, updates, deletes, ended
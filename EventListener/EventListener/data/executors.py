@@ -0,0 +1,155 @@
+import time, asyncio, threading, functools
+
+
+from collections import deque
+
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+from data.metrics import EXECUTOR_QUEUED, EXECUTOR_ACTIVE, EXECUTOR_WAIT_SECONDS
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.VRC_IO_THREADS
+
+
+log = get_logger("Executors")
+
+
+executors = {}
+
+
+def _resolve(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _daemon_call(loop, future, call):
+    try:
+        result = call()
+    except BaseException as ex:
+        loop.call_soon_threadsafe(_resolve, future, None, ex)
+    else:
+        loop.call_soon_threadsafe(_resolve, future, result, None)
+
+
+class BoundedExecutor:
+    """
+    Named thread pool for one kind of blocking work (VRChat SDK calls, website requests, the console).
+
+    At most `workers` calls run at once. The rest wait on the event loop instead of in the
+    pool's own queue, so they show up in the queue-depth gauge and are cancelled along with
+    their task. `daemon` executors run each call on a daemon thread, for calls like input()
+    that may never return and must not hold up exit.
+    """
+
+    def __init__(self, name, workers, daemon=False):
+        self.name = name
+        self.workers = max(1, workers)
+        self.daemon = daemon
+        self.pool = None if daemon else ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self.closed = False
+        # created on first use, bound to the loop that uses it
+        self._slots = None
+        self._loop = None
+        executors[name] = self
+
+    def _semaphore(self, loop):
+        if self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._loop = loop
+        return self._slots
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on one of this executor's threads and return its result."""
+        loop = asyncio.get_running_loop()
+        slots = self._semaphore(loop)
+
+        queued = time.perf_counter()
+        with EXECUTOR_QUEUED.track_inprogress(executor=self.name):
+            await slots.acquire()
+        EXECUTOR_WAIT_SECONDS.observe(time.perf_counter() - queued, executor=self.name)
+
+        try:
+            if self.closed:
+                raise RuntimeError(f"{self.name} executor is shut down")
+
+            call = functools.partial(fn, *args, **kwargs)
+            with EXECUTOR_ACTIVE.track_inprogress(executor=self.name):
+                if not self.daemon:
+                    return await loop.run_in_executor(self.pool, call)
+
+                future = loop.create_future()
+                threading.Thread(target=_daemon_call, args=(loop, future, call), name=self.name, daemon=True).start()
+                return await future
+        finally:
+            slots.release()
+
+    def shutdown(self, wait=True):
+        """Refuse new calls and drop queued ones; running calls finish (or are abandoned if daemon)."""
+        self.closed = True
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def shutdown_executors(wait=True):
+    for executor in list(executors.values()):
+        executor.shutdown(wait=wait)
+    log.debug("Executors shut down: %s", ", ".join(executors))
+
+
+class ConsoleInput:
+    """
+    The one reader of stdin, shared by the command listener and prompts such as 2FA codes.
+
+    While the listener waits in input() the console thread is taken, so a prompt raised then
+    (a login after a 401) prints its question and gets the listener's next line instead of
+    queueing behind it. Without a waiting listener a prompt reads the console itself.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.listening = False
+        self.waiting = deque()
+
+    async def ask(self, prompt):
+        if not self.listening:
+            return await self.executor.run(input, prompt)
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(future)
+        print(f"\n{prompt}", end="", flush=True)
+        return await future
+
+    async def command(self, prompt="> "):
+        """Next command line; lines typed in answer to a waiting prompt go to that prompt."""
+        while True:
+            self.listening = True
+            try:
+                line = await self.executor.run(input, "" if self.waiting else prompt)
+            except BaseException as ex:
+                while self.waiting:
+                    future = self.waiting.popleft()
+                    if not future.done():
+                        future.set_exception(ex if isinstance(ex, Exception) else EOFError())
+                raise
+            finally:
+                self.listening = False
+
+            # askers that timed out or were cancelled no longer want a line
+            while self.waiting and self.waiting[0].done():
+                self.waiting.popleft()
+            if not self.waiting:
+                return line
+            self.waiting.popleft().set_result(line)
+
+
+vrchat_io = BoundedExecutor("vrchat-io", config.VRC_IO_THREADS)
+console = BoundedExecutor("console", 1, daemon=True)
+console_input = ConsoleInput(console)
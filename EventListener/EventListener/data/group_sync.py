@@ -0,0 +1,79 @@
+import asyncio
+
+
+from data.website.groups import list_groups_on_api, add_group_to_api, update_group_on_api, delete_group_on_api
+from data.vrchatapi import fetch_group_info, member_session
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.GROUP_IDS
+config.SYNC_CONCURRENCY
+
+
+log = get_logger("GroupSync")
+
+
+async def sync_groups(group_ids=None, delete=False):
+    """
+    Bring the website's group list in line with GROUP_IDS (or `group_ids`).
+
+    One listing of the website's groups is diffed against the wanted ids: missing groups
+    are created, groups whose VRChat name changed are renamed, and with `delete` groups the
+    website has but the bot doesn't are removed. Unchanged groups cost no website call.
+    Lookups and writes run SYNC_CONCURRENCY at a time. Returns the summary counts, or None
+    if the website listing could not be read.
+    """
+    wanted = list(dict.fromkeys(config.GROUP_IDS if group_ids is None else group_ids))
+
+    remote = await list_groups_on_api()
+    if remote is None:
+        log.error("Group sync aborted: could not read the website's groups.")
+        return None
+
+    limit = asyncio.Semaphore(max(1, config.SYNC_CONCURRENCY))
+    summary = {"created": 0, "updated": 0, "unchanged": 0, "deleted": 0, "not_member": 0, "extra": 0, "failed": 0}
+
+    async def sync_one(group_id):
+        async with limit:
+            # membership comes from one cached listing per account, so this costs nothing per group
+            if await member_session(group_id) is None:
+                log.warning("Skipping %s: no bot account is a member of this group.", group_id)
+                summary["not_member"] += 1
+                return
+
+            info = await fetch_group_info(group_id)
+            if not info:
+                summary["failed"] += 1
+                return
+
+            if group_id not in remote:
+                ok, kind = await add_group_to_api(group_id, info["name"]), "created"
+            elif remote[group_id] != info["name"]:
+                ok, kind = await update_group_on_api(group_id, info["name"]), "updated"
+            else:
+                summary["unchanged"] += 1
+                return
+            summary[kind if ok else "failed"] += 1
+
+    async def delete_one(group_id):
+        async with limit:
+            summary["deleted" if await delete_group_on_api(group_id) else "failed"] += 1
+
+    wanted_set = set(wanted)
+    extra = [group_id for group_id in remote if group_id not in wanted_set]
+    tasks = [sync_one(group_id) for group_id in wanted]
+    if delete:
+        tasks += [delete_one(group_id) for group_id in extra]
+    else:
+        summary["extra"] = len(extra)
+
+    await asyncio.gather(*tasks)
+
+    log.info(
+        "Group sync: %s created, %s updated, %s unchanged, %s deleted, %s not a member, %s failed%s.",
+        summary["created"], summary["updated"], summary["unchanged"], summary["deleted"],
+        summary["not_member"], summary["failed"],
+        f", {summary['extra']} on the website but not in GROUP_ID (sync_groups delete removes them)" if summary["extra"] else "",
+    )
+    return summary
@@ -0,0 +1,145 @@
+import sys, json, queue, atexit, logging, logging.handlers
+
+
+from datetime import datetime, timezone
+
+
+import data.env_config as config
+
+
+config.LOG_LEVEL
+config.LOG_FORMAT
+config.LOG_FILE
+
+
+ROOT = "eventlistener"
+
+_ts_second = None
+_ts_text = ""
+_listener = None
+
+
+def format_ts(created):
+    """[MM/DD/YY HH:MM:SS] for a unix time; strftime only runs once per second."""
+    global _ts_second, _ts_text
+    second = int(created)
+    if second != _ts_second:
+        _ts_text = datetime.fromtimestamp(second).strftime("[%m/%d/%y %H:%M:%S]")
+        _ts_second = second
+    return _ts_text
+
+
+def get_logger(tag):
+    """Logger whose lines are prefixed with [tag], e.g. get_logger("Website")."""
+    return logging.getLogger(f"{ROOT}.{tag}")
+
+
+def _tag(record):
+    return record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+
+
+class TextFormatter(logging.Formatter):
+    """The bot's classic console format: [MM/DD/YY HH:MM:SS] [Tag] message."""
+
+    def format(self, record):
+        line = f"{format_ts(record.created)} [{_tag(record)}] {record.getMessage()}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "tag": _tag(record),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level=None, fmt=None, path=None):
+    """
+    Route every data/ logger through a queue so callers never wait on stdout or disk.
+
+    Lines go to the console (LOG_FORMAT text or json) and, if LOG_FILE is set, also to
+    that file as JSON lines. A background listener thread does the actual writing.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = level or config.LOG_LEVEL
+    fmt = fmt or config.LOG_FORMAT
+    path = path if path is not None else config.LOG_FILE
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    handlers = [console]
+
+    if path:
+        file_handler = logging.FileHandler(path, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT)
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.propagate = False
+    set_level(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+class _Relay(logging.Handler):
+    """Re-emits records from worker processes through this process's loggers."""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def start_log_relay(ctx):
+    """
+    (queue, listener) for worker processes of multiprocessing context `ctx`: records they
+    put on the queue come out of the parent's console/file handlers.
+    """
+    log_queue = ctx.Queue()
+    relay = logging.handlers.QueueListener(log_queue, _Relay())
+    relay.start()
+    return log_queue, relay
+
+
+def setup_worker_logging(log_queue, level):
+    """In a worker process: send every data/ log record to the parent over `log_queue`."""
+    root = logging.getLogger(ROOT)
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.propagate = False
+    set_level(level)
+
+
+def set_level(level):
+    """Change the level of every data/ logger at runtime. Returns False for an unknown level name."""
+    level = str(level).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        return False
+    logging.getLogger(ROOT).setLevel(level)
+    return True
+
+
+def stop_logging():
+    """Flush whatever is still queued. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
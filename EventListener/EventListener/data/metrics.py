@@ -0,0 +1,292 @@
+import time, bisect, threading
+
+
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+from data.extra import ts
+from data.logger import get_logger
+
+
+log = get_logger("Metrics")
+
+
+# upper bounds in seconds; the last bucket (+Inf) is implicit
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_text(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value)}"' for name, value in pairs) + "}"
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """[(suffix, label key, extra labels, value)] for the exposition format."""
+        with self.lock:
+            return [("", key, None, value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_label_text(self.labelnames, key, extra)} {_format(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            entry["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def quantile(self, q, **labels):
+        """Upper bound of the bucket holding the q-quantile (coarse, but good enough for a console)."""
+        with self.lock:
+            entry = self.values.get(self._key(labels))
+            if not entry or not entry["count"]:
+                return None
+            target = q * entry["count"]
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry["counts"]):
+                seen += count
+                if seen >= target:
+                    return bound
+        return float("inf")
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, entry in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), entry["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format(bound)
+                    samples.append(("_bucket", key, [("le", le)], cumulative))
+                samples.append(("_sum", key, None, entry["sum"]))
+                samples.append(("_count", key, None, entry["count"]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# upstream calls (VRChat SDK and website client)
+REQUESTS = registry.counter("eventlistener_requests_total", "Upstream requests by outcome.", ("upstream", "op", "status"))
+REQUEST_SECONDS = registry.histogram("eventlistener_request_seconds", "Upstream request latency.", ("upstream", "op"))
+IN_FLIGHT = registry.gauge("eventlistener_requests_in_flight", "Upstream requests currently running.", ("upstream",))
+THROTTLED = registry.counter("eventlistener_throttled_total", "429 responses per upstream.", ("upstream",))
+
+# sweeps and groups
+GROUP_FETCHES = registry.counter("eventlistener_group_fetches_total", "Calendar fetches per group by outcome.", ("group", "outcome"))
+GROUP_FETCH_SECONDS = registry.histogram("eventlistener_group_fetch_seconds", "Time to fetch one group's calendar and details.", ("group",))
+GROUP_EVENTS = registry.gauge("eventlistener_group_upcoming_events", "Upcoming events seen in the last fetch of a group.", ("group",))
+SWEEPS = registry.counter("eventlistener_sweeps_total", "Fetch sweeps run.")
+SWEEP_SECONDS = registry.histogram("eventlistener_sweep_seconds", "Wall time of a fetch sweep.")
+SWEEP_IN_PROGRESS = registry.gauge("eventlistener_sweeps_in_progress", "Fetch sweeps currently running.")
+EVENT_CHANGES = registry.counter("eventlistener_event_changes_total", "Event changes found by sweeps.", ("kind",))
+
+# website writes
+EVENTS_PUSHED = registry.counter("eventlistener_events_pushed_total", "Event writes to the website by outcome.", ("op", "outcome"))
+GROUP_OPS = registry.counter("eventlistener_group_ops_total", "Group writes to the website by outcome.", ("op", "outcome"))
+OUTBOX_PENDING = registry.gauge("eventlistener_outbox_pending", "Website writes waiting in the outbox.")
+OUTBOX_DEAD = registry.gauge("eventlistener_outbox_dead_letters", "Website writes parked in the dead-letter file.")
+
+# VRChat pipeline (websocket)
+PIPELINE_CONNECTED = registry.gauge("eventlistener_pipeline_connected", "1 while the VRChat pipeline websocket is connected.")
+PIPELINE_MESSAGES = registry.counter("eventlistener_pipeline_messages_total", "Pipeline messages received by type.", ("type",))
+PIPELINE_REFETCHES = registry.counter("eventlistener_pipeline_refetches_total", "Group fetches triggered by pipeline messages.")
+
+# executors (blocking work run off the event loop)
+EXECUTOR_QUEUED = registry.gauge("eventlistener_executor_queued", "Calls waiting for a free thread, per executor.", ("executor",))
+EXECUTOR_ACTIVE = registry.gauge("eventlistener_executor_active", "Calls running on an executor thread.", ("executor",))
+EXECUTOR_WAIT_SECONDS = registry.histogram("eventlistener_executor_wait_seconds", "Time a call waited for a free thread.", ("executor",))
+
+# VRChat session
+LOGINS = registry.counter("eventlistener_logins_total", "VRChat login attempts by outcome.", ("outcome",))
+LOGIN_SECONDS = registry.histogram("eventlistener_login_seconds", "Time to log in to VRChat.")
+REAUTHS = registry.counter("eventlistener_reauth_total", "Session refreshes by reason (unauthorized, expiring, retry).", ("reason",))
+
+
+def observe_request(upstream, op, status, seconds):
+    REQUESTS.inc(upstream=upstream, op=op, status=status)
+    REQUEST_SECONDS.observe(seconds, upstream=upstream, op=op)
+    if str(status) == "429":
+        THROTTLED.inc(upstream=upstream)
+
+
+def print_stats():
+    """Human readable summary for the `stats` console command."""
+    def per_label(metric, label):
+        totals = {}
+        with metric.lock:
+            for key, value in metric.values.items():
+                name = key[metric.labelnames.index(label)]
+                totals[name] = totals.get(name, 0) + (value["count"] if isinstance(value, dict) else value)
+        return totals
+
+    print(f"{ts()} [Metrics] Sweeps: {SWEEPS.values.get((), 0)} run, {SWEEP_IN_PROGRESS.values.get((), 0)} in progress, "
+          f"p50 <= {SWEEP_SECONDS.quantile(0.5)}s, p99 <= {SWEEP_SECONDS.quantile(0.99)}s")
+
+    errors = {}
+    with REQUESTS.lock:
+        for (upstream, _, status), value in REQUESTS.values.items():
+            if not status.startswith("2"):
+                errors[upstream] = errors.get(upstream, 0) + value
+
+    with REQUEST_SECONDS.lock:
+        keys = sorted(REQUEST_SECONDS.values)
+    for upstream, op in keys:
+        count = REQUEST_SECONDS.values[(upstream, op)]["count"]
+        print(f"  {upstream} {op}: {count} calls, p50 <= {REQUEST_SECONDS.quantile(0.5, upstream=upstream, op=op)}s, "
+              f"p99 <= {REQUEST_SECONDS.quantile(0.99, upstream=upstream, op=op)}s")
+
+    for upstream, in_flight in sorted(per_label(IN_FLIGHT, "upstream").items()):
+        print(f"  {upstream}: {in_flight} in flight, {errors.get(upstream, 0)} failed, {THROTTLED.values.get((upstream,), 0)} throttled")
+
+    failed_groups = {key[0]: value for key, value in GROUP_FETCHES.values.items() if key[1] == "failed"}
+    if failed_groups:
+        print("  groups with failed fetches: " + ", ".join(f"{gid} ({n})" for gid, n in sorted(failed_groups.items())))
+
+    print(f"  changes: {per_label(EVENT_CHANGES, 'kind') or 'none'}")
+    pushes = ", ".join(f"{op} {outcome} {n}" for (op, outcome), n in sorted(EVENTS_PUSHED.values.items()) if n)
+    print(f"  event pushes: {pushes or 'none'}")
+    print(f"  outbox: {OUTBOX_PENDING.values.get((), 0)} pending, {OUTBOX_DEAD.values.get((), 0)} dead letters")
+
+    queued = per_label(EXECUTOR_QUEUED, "executor")
+    for name, active in sorted(per_label(EXECUTOR_ACTIVE, "executor").items()):
+        print(f"  executor {name}: {active} running, {queued.get(name, 0)} queued, "
+              f"wait p99 <= {EXECUTOR_WAIT_SECONDS.quantile(0.99, executor=name)}s")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics in a daemon thread. Returns the server, or None when disabled (port 0)."""
+    if not port:
+        return None
+
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as ex:
+        log.warning("Could not listen on %s:%s: %s", host, port, ex)
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log.info("Serving http://%s:%s/metrics", host, port)
+    return server
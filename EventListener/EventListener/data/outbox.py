@@ -0,0 +1,220 @@
+import os, json, time, random, asyncio
+
+
+from data.event_store import get_event_store, event_fingerprint, to_epoch
+from data.website.events import send_to_website, push_event_updates, delete_event_on_api, website_configured, UPDATED, DELETED
+from data.metrics import OUTBOX_PENDING, OUTBOX_DEAD
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.OUTBOX_MAX_ATTEMPTS
+config.OUTBOX_BASE_BACKOFF
+config.OUTBOX_MAX_BACKOFF
+config.OUTBOX_INTERVAL
+
+
+log = get_logger("Outbox")
+
+
+BASE_DIR = os.path.dirname(__file__)
+OUTBOX_FILE = os.path.join(BASE_DIR, "..", "outbox.json")
+DEAD_LETTER_FILE = os.path.join(BASE_DIR, "..", "dead_letters.json")
+
+
+def _item_key(group_id, event_id):
+    return f"{group_id}/{event_id}"
+
+
+def _record_fields(item):
+    """(fingerprint, expires_at) for the store; items queued before these were kept get them recomputed."""
+    fingerprint = item.get("fingerprint") or event_fingerprint(item["payload"])
+    expires_at = item.get("expires_at")
+    if expires_at is None:
+        expires_at = to_epoch(item["payload"]["ends_at"])
+    return fingerprint, expires_at
+
+
+def backoff_delay(attempts):
+    """Exponential backoff capped at OUTBOX_MAX_BACKOFF, with +-50% jitter so retries spread out."""
+    delay = min(config.OUTBOX_MAX_BACKOFF, config.OUTBOX_BASE_BACKOFF * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as ex:
+        log.warning("Could not read %s, starting empty: %s", path, ex)
+        return {}
+
+
+def _dump(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class Outbox:
+    """
+    Durable queue of website writes (create / update / delete).
+
+    Writes are recorded before they are attempted, so nothing is lost if the website
+    is down or the bot restarts. Each failure pushes the next attempt back; after
+    OUTBOX_MAX_ATTEMPTS the item moves to the dead-letter file until replayed.
+    """
+
+    def __init__(self, path=OUTBOX_FILE, dead_letter_path=DEAD_LETTER_FILE):
+        self.path = path
+        self.dead_letter_path = dead_letter_path
+        self.items = _load(path)
+        self.dead_letters = _load(dead_letter_path)
+        self._lock = None
+
+    def enqueue(self, op, group_id, event_id, payload=None, website_id=None, fingerprint=None, expires_at=None):
+        key = _item_key(group_id, event_id)
+        if key in self.dead_letters:
+            # parked until someone replays it; don't keep re-failing every sweep
+            return
+
+        previous = self.items.get(key)
+        if previous and previous["op"] == "create" and op == "update":
+            # never reached the website, so the newest content is still a create
+            op = "create"
+
+        self.items[key] = {
+            "op": op,
+            "group_id": group_id,
+            "event_id": event_id,
+            "payload": payload,
+            "website_id": website_id,
+            "fingerprint": fingerprint,
+            "expires_at": expires_at,
+            "attempts": previous["attempts"] if previous and previous["op"] == op else 0,
+            "next_attempt_at": previous["next_attempt_at"] if previous and previous["op"] == op else 0,
+            "last_error": previous.get("last_error") if previous else None,
+        }
+
+    def is_pending(self, group_id, event_id):
+        return _item_key(group_id, event_id) in self.items
+
+    def drop_dead_letter(self, group_id, event_id):
+        """Forget a parked write that no longer applies. Returns the dropped item, None if there was none."""
+        return self.dead_letters.pop(_item_key(group_id, event_id), None)
+
+    def pending_count(self):
+        return len(self.items)
+
+    def save(self):
+        _dump(self.path, self.items)
+        _dump(self.dead_letter_path, self.dead_letters)
+        OUTBOX_PENDING.set(len(self.items))
+        OUTBOX_DEAD.set(len(self.dead_letters))
+
+    def _delivered(self, item):
+        self.items.pop(_item_key(item["group_id"], item["event_id"]), None)
+
+    def _failed(self, item, error):
+        key = _item_key(item["group_id"], item["event_id"])
+        item["attempts"] += 1
+        item["last_error"] = error
+
+        if item["attempts"] >= config.OUTBOX_MAX_ATTEMPTS:
+            item["dead_at"] = time.time()
+            self.dead_letters[key] = self.items.pop(key)
+            log.warning("%s of %s failed %s times, moved to dead letters.", item['op'], item['event_id'], item['attempts'])
+        else:
+            item["next_attempt_at"] = time.time() + backoff_delay(item["attempts"])
+
+    def replay_dead_letters(self):
+        """Move every dead letter back to the queue with a fresh attempt budget."""
+        replayed = 0
+        for key, item in list(self.dead_letters.items()):
+            item.pop("dead_at", None)
+            item["attempts"] = 0
+            item["next_attempt_at"] = 0
+            self.items.setdefault(key, item)
+            del self.dead_letters[key]
+            replayed += 1
+        self.save()
+        return replayed
+
+    async def deliver_due(self):
+        """Attempt every item whose backoff has elapsed. Returns the number delivered."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self.items or not website_configured():
+                return 0
+
+            now = time.time()
+            due = [item for item in self.items.values() if item["next_attempt_at"] <= now]
+            if not due:
+                return 0
+
+            store = get_event_store()
+            delivered = 0
+
+            # updates first: one the website has no event for any more becomes a create below
+            for item in (item for item in due if item["op"] == "update"):
+                key = (item["group_id"], item["event_id"])
+                status = (await push_event_updates([(item["website_id"], item["payload"])])).get(key)
+                if status in UPDATED:
+                    fingerprint, expires_at = _record_fields(item)
+                    store.put(*key, fingerprint, expires_at=expires_at)
+                    self._delivered(item)
+                    delivered += 1
+                elif status == 404:
+                    log.info("%s was deleted on the website, posting it again.", item["event_id"])
+                    # the stored website id is dead; the create records the new one
+                    store.remove(*key)
+                    item.update(op="create", website_id=None, attempts=0, next_attempt_at=0)
+                else:
+                    self._failed(item, f"update was not accepted ({status})")
+
+            creates = [item for item in due if item["op"] == "create"]
+            if creates:
+                sent = await send_to_website([item["payload"] for item in creates])
+                for item in creates:
+                    key = (item["group_id"], item["event_id"])
+                    if key in sent:
+                        fingerprint, expires_at = _record_fields(item)
+                        store.put(*key, fingerprint, website_id=sent[key], expires_at=expires_at)
+                        self._delivered(item)
+                        delivered += 1
+                    else:
+                        self._failed(item, "create was not accepted")
+
+            for item in (item for item in due if item["op"] == "delete"):
+                status = await delete_event_on_api(item["website_id"])
+                if status in DELETED:
+                    store.remove(item["group_id"], item["event_id"])
+                    self._delivered(item)
+                    delivered += 1
+                else:
+                    self._failed(item, f"delete was not accepted ({status})")
+
+            store.save()
+            self.save()
+
+            if delivered or self.items:
+                log.info("Delivered %s/%s, %s pending, %s dead.", delivered, len(due), len(self.items), len(self.dead_letters))
+            return delivered
+
+
+outbox = Outbox()
+
+
+async def outbox_worker():
+    """Redeliver pending writes in the background, e.g. once the website is back up."""
+    while True:
+        await asyncio.sleep(config.OUTBOX_INTERVAL)
+        try:
+            await outbox.deliver_due()
+        except Exception as ex:
+            log.warning("Delivery pass failed: %s", ex)
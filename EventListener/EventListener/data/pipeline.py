@@ -0,0 +1,169 @@
+import re, json, time, random, asyncio
+
+
+from urllib.parse import urlsplit, urlunsplit, urlencode, parse_qsl
+
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # optional dependency (websockets >= 14)
+    ws_connect = None
+
+
+from data.logger import get_logger
+from data.scheduler import scheduler
+from data.vrchatapi import fetch_vrc_events, auth_token, session_for, default_session
+from data.metrics import PIPELINE_CONNECTED, PIPELINE_MESSAGES, PIPELINE_REFETCHES
+import data.env_config as config
+
+
+config.CONTACT
+config.GROUP_IDS
+config.VRC_PIPELINE
+config.VRC_PIPELINE_URL
+config.VRC_PIPELINE_DEBOUNCE
+
+
+log = get_logger("VRChat-Pipeline")
+
+
+GROUP_ID_PATTERN = re.compile(r"grp_[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+# high-volume message types that never concern a group calendar
+IGNORED_TYPES = ("friend-", "user-location", "user-update", "see-notification", "hide-notification")
+
+RECONNECT_MIN = 1.0
+RECONNECT_MAX = 60.0
+
+
+def groups_in_message(raw, wanted):
+    """
+    (type, {group ids}) for one pipeline frame, keeping only ids in `wanted`.
+
+    Frames look like {"type": ..., "content": "<json string>"}. The content layout differs
+    per type (group-*, notification, notification-v2, ...), so rather than knowing every
+    schema we look for group ids anywhere in it.
+    """
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        return None, set()
+
+    kind = str(message.get("type", ""))
+    if kind.startswith(IGNORED_TYPES):
+        return kind, set()
+
+    content = message.get("content")
+    text = content if isinstance(content, str) else json.dumps(content)
+    return kind, {gid for gid in GROUP_ID_PATTERN.findall(text) if gid in wanted}
+
+
+def _with_token(url, token):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "authToken"] + [("authToken", token)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class PipelineListener:
+    """
+    Listens on the VRChat pipeline websocket and refetches just the groups a message mentions.
+
+    Messages for the same group are coalesced for VRC_PIPELINE_DEBOUNCE seconds. While the
+    socket is up the scheduler stretches regular polls of the groups it covers; when it
+    drops, polling takes over again at normal intervals.
+    """
+
+    def __init__(self, url, debounce, token_provider=auth_token):
+        self.url = url
+        self.debounce = debounce
+        self.token_provider = token_provider
+        self.pending = {}
+        self.connected = False
+
+    def handle(self, raw):
+        kind, group_ids = groups_in_message(raw, set(config.GROUP_IDS))
+        PIPELINE_MESSAGES.inc(type=kind or "invalid")
+
+        due = time.monotonic() + self.debounce
+        for group_id in group_ids:
+            self.pending.setdefault(group_id, due)
+            log.debug("%s mentions %s, refetching in %.0fs.", kind, group_id, self.debounce)
+
+    async def refetch(self, group_ids):
+        PIPELINE_REFETCHES.inc(len(group_ids))
+        log.info("Refetching %s after pipeline update.", ", ".join(group_ids))
+        results = await fetch_vrc_events(group_ids, fresh=True)
+        scheduler.record_results(results)
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(max(0.1, min(1.0, self.debounce)))
+            now = time.monotonic()
+            due = [group_id for group_id, when in self.pending.items() if when <= now]
+            if not due:
+                continue
+
+            for group_id in due:
+                del self.pending[group_id]
+            try:
+                await self.refetch(due)
+            except Exception as ex:
+                log.error("Refetch after pipeline update failed: %s", ex)
+
+    async def covered_groups(self):
+        """
+        Groups this socket hears about: the pipeline speaks for the first account (whose
+        token it uses), so only groups that account fetches; the others keep polling.
+        """
+        group_ids = list(config.GROUP_IDS)
+        owners = await asyncio.gather(*(session_for(group_id) for group_id in group_ids))
+        return [group_id for group_id, session in zip(group_ids, owners) if session is default_session]
+
+    def _set_connected(self, connected, group_ids=()):
+        self.connected = connected
+        PIPELINE_CONNECTED.set(1 if connected else 0)
+        scheduler.set_push_active(connected, group_ids)
+
+    async def run(self):
+        flusher = asyncio.ensure_future(self.flush_loop())
+        delay = RECONNECT_MIN
+
+        try:
+            while True:
+                token = self.token_provider()
+                if not token:
+                    await asyncio.sleep(RECONNECT_MIN)
+                    continue
+
+                try:
+                    async with ws_connect(_with_token(self.url, token), user_agent_header=str(config.CONTACT)) as ws:
+                        covered = await self.covered_groups()
+                        log.info("Connected to %s, polling relaxed for %s of %s groups.", urlsplit(self.url).netloc, len(covered), len(config.GROUP_IDS))
+                        self._set_connected(True, covered)
+                        delay = RECONNECT_MIN
+                        async for raw in ws:
+                            self.handle(raw)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    log.warning("Connection lost (%s), falling back to polling.", ex)
+                else:
+                    log.warning("Connection closed, falling back to polling.")
+
+                self._set_connected(False)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(RECONNECT_MAX, delay * 2)
+        finally:
+            self._set_connected(False)
+            flusher.cancel()
+
+
+async def pipeline_listener():
+    """Run the pipeline listener if VRC_PIPELINE is on and websockets is installed."""
+    if not config.VRC_PIPELINE:
+        return
+    if ws_connect is None:
+        log.warning("VRC_PIPELINE is on but the websockets package (>= 14) is not installed; polling only.")
+        return
+
+    await PipelineListener(config.VRC_PIPELINE_URL, config.VRC_PIPELINE_DEBOUNCE).run()
@@ -0,0 +1,107 @@
+import time, asyncio
+
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+import data.env_config as config
+
+
+config.WEBSITE_RATE
+
+
+def parse_retry_after(value):
+    """Retry-After header (seconds or HTTP date) -> seconds to wait, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to the upstream.
+
+    A 429 halves the rate (down to 1/16 of the configured one) and honours Retry-After;
+    each success creeps the rate back up by 5% of the configured maximum.
+    """
+
+    def __init__(self, rate):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttle_count = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.max_rate <= 0:
+            return
+
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttled(self, retry_after=None):
+        self.throttle_count += 1
+        self.rate = max(self.max_rate / 16, self.rate / 2)
+        self.tokens = 0.0
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class RateLimiter:
+    """One adaptive TokenBucket per upstream host."""
+
+    def __init__(self, default_rate):
+        self.default_rate = default_rate
+        self.buckets = {}
+
+    def bucket(self, host, rate=None):
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(rate if rate is not None else self.default_rate)
+        return self.buckets[host]
+
+    async def acquire(self, host, rate=None):
+        await self.bucket(host, rate).acquire()
+
+    def feedback(self, host, status, headers=None):
+        """Report a response so the host's budget can adapt. Returns True if it was throttled."""
+        bucket = self.bucket(host)
+        if status == 429:
+            retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+            bucket.throttled(retry_after)
+            return True
+        if status is not None and status < 500:
+            bucket.succeeded()
+        return False
+
+
+limiter = RateLimiter(default_rate=config.WEBSITE_RATE)
@@ -0,0 +1,175 @@
+import asyncio
+
+
+from datetime import datetime, timedelta, timezone
+
+
+from data.website.events import list_events_on_api, delete_event_on_api, DELETED
+from data.vrchatapi import fetch_group_events, session_for
+from data.event_store import get_event_store, to_epoch
+from data.outbox import outbox
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.GROUP_IDS
+config.FETCH_CONCURRENCY
+config.SYNC_CONCURRENCY
+config.CALENDAR_HORIZON_DAYS
+config.RECONCILE_INTERVAL
+config.WEBSITE_KEEP_ENDED_HOURS
+
+
+log = get_logger("Reconcile")
+
+
+def _pick_kept(items, record):
+    """Of several website copies of one event, keep the one the store points at (else the first)."""
+    website_id = record.get("website_id") if record else None
+    for item in items:
+        if website_id is not None and str(item.get("id")) == website_id:
+            return item
+    return items[0]
+
+
+async def _fetch_upstream(group_ids):
+    """{event_id: Event} of every group that could be fetched, and the set of those groups."""
+    limit = asyncio.Semaphore(max(1, config.FETCH_CONCURRENCY))
+
+    async def fetch(group_id):
+        async with limit:
+            return group_id, await fetch_group_events(group_id, await session_for(group_id))
+
+    upstream, fetched = {}, set()
+    for group_id, events in await asyncio.gather(*(fetch(group_id) for group_id in group_ids)):
+        if events is None:
+            # a failed fetch says nothing about what was removed upstream
+            continue
+        fetched.add(group_id)
+        for event in events:
+            upstream[event.event_id] = event
+    return upstream, fetched
+
+
+async def reconcile_website(group_ids=None):
+    """
+    Compare the website's event listing with the VRChat calendars and fix the difference.
+
+    The listing is indexed by vrc_event_id. Events that ended more than
+    WEBSITE_KEEP_ENDED_HOURS ago, events of a fetched group that are gone upstream and
+    duplicate copies are deleted, SYNC_CONCURRENCY at a time; upcoming events the website
+    is missing are queued as creates, but only if the listing was provably complete (the
+    website reported a total and that many events were read). Website ids the store lost
+    track of are written back. Events with writes still in the outbox are left alone; a
+    dead-lettered write for an event the website is missing is dropped in favour of the
+    create. Returns the summary counts, or None if the website listing could not be read.
+    """
+    group_ids = list(config.GROUP_IDS if group_ids is None else group_ids)
+
+    listed, complete = await list_events_on_api()
+    if listed is None:
+        log.error("Reconcile aborted: could not read the website's events.")
+        return None
+
+    upstream, fetched = await _fetch_upstream(group_ids)
+
+    store = get_event_store()
+    now = datetime.now(timezone.utc)
+    keep_ended_until = now.timestamp() - config.WEBSITE_KEEP_ENDED_HOURS * 3600
+    horizon = (now + timedelta(days=config.CALENDAR_HORIZON_DAYS)).timestamp() if config.CALENDAR_HORIZON_DAYS > 0 else None
+
+    index = {}
+    for item in listed:
+        index.setdefault(str(item["vrc_event_id"]), []).append(item)
+
+    summary = {"listed": len(listed), "deleted": 0, "created": 0, "relinked": 0, "failed": 0}
+    deletes = []
+
+    for event_id, items in index.items():
+        group_id = str(items[0].get("vrc_group_id"))
+        if outbox.is_pending(group_id, event_id):
+            # a write for it is already on its way; the outbox settles it
+            continue
+
+        record = store.get(group_id, event_id)
+        kept = _pick_kept(items, record)
+        deletes += [("duplicate", item) for item in items if item is not kept]
+
+        ends_at = to_epoch(kept.get("ends_at"))
+        starts_at = to_epoch(kept.get("starts_at"))
+        if ends_at is not None and ends_at < now.timestamp():
+            if ends_at < keep_ended_until:
+                deletes.append(("ended", kept))
+            continue
+        if group_id in fetched and event_id not in upstream:
+            if horizon is None or starts_at is None or starts_at <= horizon:
+                deletes.append(("removed", kept))
+            continue
+
+        website_id = str(kept.get("id")) if kept.get("id") is not None else None
+        if group_id in fetched and website_id is not None and (record is None or record.get("website_id") != website_id):
+            # no hash if the store never saw it: the next sweep compares and updates it
+            store.put(group_id, event_id, record["hash"] if record else None, website_id=website_id, expires_at=ends_at)
+            summary["relinked"] += 1
+
+    if not complete and upstream:
+        # an unread page would make every event on it look missing and get it posted twice
+        log.warning("Website listing reported no total or was cut short; not re-creating missing events.")
+        upstream = {}
+
+    for event_id, event in upstream.items():
+        if event_id in index or outbox.is_pending(event.group_id, event_id):
+            continue
+        dropped = outbox.drop_dead_letter(event.group_id, event_id)
+        if dropped:
+            log.info("Dropping the dead-lettered %s of %s, the website no longer has it.", dropped["op"], event_id)
+            # its website id, if any, points at nothing; the create records the new one
+            store.remove(event.group_id, event_id)
+        outbox.enqueue(
+            "create", event.group_id, event_id,
+            payload=event.payload(),
+            fingerprint=event.fingerprint(),
+            expires_at=event.ends_epoch,
+        )
+        summary["created"] += 1
+
+    limit = asyncio.Semaphore(max(1, config.SYNC_CONCURRENCY))
+
+    async def delete_one(reason, item):
+        group_id, event_id, website_id = str(item.get("vrc_group_id")), str(item["vrc_event_id"]), str(item.get("id"))
+        async with limit:
+            if await delete_event_on_api(website_id) not in DELETED:
+                summary["failed"] += 1
+                return
+        summary["deleted"] += 1
+        log.debug("Deleted %s event %s (%s) from %s.", reason, event_id, website_id, group_id)
+
+        record = store.get(group_id, event_id)
+        if reason != "duplicate" and record is not None and record.get("website_id") in (None, website_id):
+            store.remove(group_id, event_id)
+
+    await asyncio.gather(*(delete_one(reason, item) for reason, item in deletes if item.get("id") is not None))
+    store.save()
+
+    if summary["created"]:
+        outbox.save()
+        await outbox.deliver_due()
+
+    log.info(
+        "Website has %s events: %s deleted, %s re-created, %s relinked, %s failed.",
+        summary["listed"], summary["deleted"], summary["created"], summary["relinked"], summary["failed"],
+    )
+    return summary
+
+
+async def reconcile_loop():
+    """Reconcile every RECONCILE_INTERVAL seconds (0 disables it)."""
+    if config.RECONCILE_INTERVAL <= 0:
+        return
+
+    while True:
+        await asyncio.sleep(config.RECONCILE_INTERVAL)
+        try:
+            await reconcile_website()
+        except Exception:
+            log.exception("Reconcile failed")
@@ -0,0 +1,172 @@
+import time, heapq, random
+
+
+from data.extra import ts
+import data.env_config as config
+
+
+config.POLL_MIN_INTERVAL
+config.POLL_MAX_INTERVAL
+
+
+# weight of the latest sweep in a group's change rate (0..1)
+CHANGE_RATE_ALPHA = 0.3
+
+
+class GroupScheduler:
+    """
+    Per-group poll times kept in a min-heap.
+
+    A group is polled more often the sooner its next event starts and the more often its
+    calendar changed over recent polls; quiet groups drift out to POLL_MAX_INTERVAL.
+    """
+
+    def __init__(self, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.heap = []
+        self.next_poll = {}
+        self.state = {}
+        self.push_active = False
+        # groups the pipeline reports on; only these are polled less while it is connected
+        self.push_groups = set()
+
+    def _schedule(self, group_id, when):
+        self.next_poll[group_id] = when
+        heapq.heappush(self.heap, (when, group_id))
+
+    def sync(self, group_ids):
+        """Start tracking new groups (due immediately) and forget removed ones."""
+        wanted = set(group_ids)
+        for group_id in group_ids:
+            if group_id not in self.state:
+                self.state[group_id] = {"change_rate": 0.0, "next_start": None, "failures": 0, "last_fetch": None}
+                self._schedule(group_id, time.time())
+
+        for group_id in list(self.state):
+            if group_id not in wanted:
+                del self.state[group_id]
+                self.next_poll.pop(group_id, None)
+
+    def due_groups(self, group_ids):
+        """Pop every group whose poll time has come, in poll-time order."""
+        self.sync(group_ids)
+        now = time.time()
+        due = []
+
+        while self.heap and self.heap[0][0] <= now:
+            when, group_id = heapq.heappop(self.heap)
+            # skip stale heap entries left behind by a reschedule or removal
+            if self.next_poll.get(group_id) == when:
+                del self.next_poll[group_id]
+                due.append(group_id)
+
+        return due
+
+    def interval_for(self, group_id, now=None):
+        now = now or time.time()
+        state = self.state[group_id]
+
+        if state["failures"]:
+            return min(self.max_interval, self.min_interval * 2 ** (state["failures"] - 1))
+
+        # busy calendars slide from max towards min interval; while the VRChat pipeline reports
+        # changes the change rate doesn't shorten polls, but it misses edits and removals, so
+        # events starting soon still cap the interval below
+        change_rate = 0.0 if group_id in self.push_groups else state["change_rate"]
+        interval = self.max_interval - (self.max_interval - self.min_interval) * change_rate
+
+        # an upcoming event caps the interval at a quarter of the time left until it starts
+        if state["next_start"] is not None:
+            interval = min(interval, max(self.min_interval, (state["next_start"] - now) / 4))
+
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def record(self, group_id, ok, changed=False, next_start=None):
+        if group_id not in self.state:
+            return
+
+        state = self.state[group_id]
+        if ok:
+            state["failures"] = 0
+            state["last_fetch"] = time.time()
+            state["change_rate"] = (1 - CHANGE_RATE_ALPHA) * state["change_rate"] + CHANGE_RATE_ALPHA * (1.0 if changed else 0.0)
+            state["next_start"] = next_start
+        else:
+            state["failures"] += 1
+
+        # a little jitter keeps groups that were added together from staying in lockstep
+        interval = self.interval_for(group_id) * random.uniform(0.9, 1.1)
+        interval = max(self.min_interval, min(self.max_interval, interval))
+        self._schedule(group_id, time.time() + interval)
+
+    def set_push_active(self, active, group_ids=()):
+        """
+        Switch between push-driven and poll-driven intervals for `group_ids`, the groups the
+        pipeline reports on. Groups that lose push are pulled back to the poll interval they
+        would have had, so nothing waits out a long one.
+        """
+        groups = set(group_ids) if active else set()
+        released = self.push_groups - groups
+        self.push_active = active
+        self.push_groups = groups
+
+        now = time.time()
+        for group_id in released:
+            if group_id in self.next_poll:
+                self._schedule(group_id, min(self.next_poll[group_id], now + self.interval_for(group_id, now)))
+
+    def export_state(self):
+        """{group_id: state plus "next_poll"} of every tracked group, for the warm-start snapshot."""
+        return {
+            group_id: dict(state, next_poll=self.next_poll.get(group_id))
+            for group_id, state in self.state.items()
+        }
+
+    def restore(self, groups):
+        """
+        Resume groups from export_state() output instead of polling them all at once.
+
+        Polls that fell due while the bot was down are spread over POLL_MIN_INTERVAL, and
+        none is pushed out further than POLL_MAX_INTERVAL from now. Returns how many groups
+        were restored; groups restored here are not polled immediately by sync().
+        """
+        now = time.time()
+        restored = 0
+        for group_id, saved in groups.items():
+            state = {
+                "change_rate": min(1.0, max(0.0, float(saved.get("change_rate") or 0.0))),
+                "next_start": saved.get("next_start"),
+                "failures": int(saved.get("failures") or 0),
+                "last_fetch": saved.get("last_fetch"),
+            }
+            when = saved.get("next_poll")
+            if when is None or when <= now:
+                when = now + random.uniform(0, self.min_interval)
+            self.state[group_id] = state
+            self._schedule(group_id, min(when, now + self.max_interval))
+            restored += 1
+        return restored
+
+    def record_results(self, results):
+        for group_id, result in results.items():
+            self.record(group_id, result["ok"], result["changed"], result["next_start"])
+
+    def sleep_time(self, cap=60):
+        """Seconds until the next group is due, capped so new GROUP_IDS are noticed quickly."""
+        if not self.next_poll:
+            return cap
+        return max(1.0, min(cap, min(self.next_poll.values()) - time.time()))
+
+    def describe(self):
+        now = time.time()
+        for group_id, when in sorted(self.next_poll.items(), key=lambda item: item[1]):
+            state = self.state[group_id]
+            last = f"{now - state['last_fetch']:.0f}s ago" if state["last_fetch"] else "never"
+            print(
+                f"{ts()} [Scheduler] {group_id}: next poll in {max(0, when - now):.0f}s "
+                f"(change rate {state['change_rate']:.2f}, failures {state['failures']}, last fetch {last})"
+            )
+
+
+scheduler = GroupScheduler(config.POLL_MIN_INTERVAL, config.POLL_MAX_INTERVAL)
@@ -0,0 +1,39 @@
+import bisect, hashlib
+
+
+def _point(key):
+    # md5 rather than hash(): the ring has to look the same in every process and run
+    return int(hashlib.md5(str(key).encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping keys (group ids) to nodes (account names).
+
+    Each node is placed `replicas` times so groups spread evenly, and adding or removing
+    an account only moves the groups that hashed next to it.
+    """
+
+    def __init__(self, nodes, replicas=64):
+        self.nodes = list(dict.fromkeys(nodes))
+        self.ring = sorted((_point(f"{node}#{i}"), node) for node in self.nodes for i in range(max(1, replicas)))
+        self.points = [point for point, _ in self.ring]
+
+    def preference(self, key):
+        """Every node, in the order `key` should try them: its owner first, then its fallbacks."""
+        if not self.ring:
+            return []
+
+        order = []
+        start = bisect.bisect(self.points, _point(key))
+        for i in range(len(self.ring)):
+            node = self.ring[(start + i) % len(self.ring)][1]
+            if node not in order:
+                order.append(node)
+                if len(order) == len(self.nodes):
+                    break
+        return order
+
+    def owner(self, key):
+        order = self.preference(key)
+        return order[0] if order else None
@@ -0,0 +1,109 @@
+import os, json, time, hashlib
+
+
+from data.scheduler import scheduler
+from data.event_store import get_event_store
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.GROUP_IDS
+
+
+log = get_logger("Snapshot")
+
+
+SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), "..", "snapshot.json")
+# bump when the layout changes; older snapshots are ignored, not misread
+SNAPSHOT_VERSION = 1
+
+
+def calendar_digest(fingerprints):
+    """One hash over a group's {event_id: fingerprint}, to tell if the event store still matches."""
+    raw = json.dumps(sorted(fingerprints.items()), separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def save_snapshot(path=None):
+    """Write the scheduler state and a digest of every group's stored events, atomically."""
+    path = path or SNAPSHOT_FILE
+    store = get_event_store()
+    groups = {}
+    for group_id, state in scheduler.export_state().items():
+        groups[group_id] = dict(state, digest=calendar_digest(store.fingerprints(group_id)))
+
+    snapshot = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "groups": groups}
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+    except OSError as ex:
+        log.warning("Could not write %s: %s", path, ex)
+
+
+def _read(path):
+    """The snapshot's groups, or None if there is no usable snapshot."""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        version = snapshot.get("version")
+        groups = snapshot["groups"]
+        if not isinstance(groups, dict):
+            raise ValueError("groups is not a mapping")
+    except (OSError, ValueError, KeyError, AttributeError) as ex:
+        log.warning("Snapshot %s is unreadable (%s), moved aside; starting cold.", path, ex)
+        try:
+            os.replace(path, f"{path}.corrupt")
+        except OSError:
+            pass
+        return None
+
+    if version != SNAPSHOT_VERSION:
+        log.info("Snapshot %s has version %s (expected %s), starting cold.", path, version, SNAPSHOT_VERSION)
+        return None
+
+    log.debug("Snapshot from %.0fs ago.", time.time() - (snapshot.get("saved_at") or 0))
+    return groups
+
+
+def _valid(saved):
+    if not isinstance(saved, dict):
+        return False
+    for name in ("next_poll", "last_fetch", "next_start", "change_rate"):
+        if saved.get(name) is not None and not isinstance(saved[name], (int, float)):
+            return False
+    return isinstance(saved.get("failures", 0), int) and isinstance(saved.get("digest"), str)
+
+
+def load_snapshot(path=None):
+    """
+    Resume the scheduler from the last snapshot. Returns how many groups were restored.
+
+    A group is only restored if it is still in GROUP_IDS and the event store still holds
+    the events it had when the snapshot was taken; anything else (new groups, a replaced
+    events.db, damaged entries) is polled right away as on a cold start.
+    """
+    groups = _read(path or SNAPSHOT_FILE)
+    if not groups:
+        return 0
+
+    store = get_event_store()
+    wanted = set(config.GROUP_IDS)
+    resumed, skipped = {}, 0
+    for group_id, saved in groups.items():
+        if group_id not in wanted:
+            continue
+        if not _valid(saved) or saved["digest"] != calendar_digest(store.fingerprints(group_id)):
+            skipped += 1
+            continue
+        resumed[group_id] = saved
+
+    restored = scheduler.restore(resumed)
+    cold = len(wanted) - restored
+    log.info("Resumed %s groups from the snapshot, %s will be polled now%s.",
+             restored, cold, f" ({skipped} did not match the event store)" if skipped else "")
+    return restored
@@ -1,258 +1,996 @@
-import os, asyncio, json, logging, http.cookiejar, requests, vrchatapi
-
-
-from vrchatapi.api import authentication_api, groups_api, calendar_api, users_api
-from vrchatapi.models.two_factor_email_code import TwoFactorEmailCode
-from vrchatapi.exceptions import UnauthorizedException, ApiException
-
-
-from datetime import datetime, timezone
-
-
-from data.extra import ts, load_existing_events, save_new_events
-from data.website.events import send_to_website
-import data.env_config as config
-
-
-config.VRC_USER
-config.VRC_PASS
-config.CONTACT
-config.GROUP_IDS
-
-
-configuration = vrchatapi.Configuration(username=config.VRC_USER, password=config.VRC_PASS)
-client = vrchatapi.ApiClient(configuration)
-client.user_agent = f"{config.CONTACT}"
-
-
-auth_api = authentication_api.AuthenticationApi(client)
-groups_api_instance = groups_api.GroupsApi(client)
-calendar_api_instance = calendar_api.CalendarApi(client)
-users_api_instance = users_api.UsersApi(client)
-
-
-AUTH_TOKEN_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "vrc_auth_token.json")
-
-
-async def login_vrc():
-    loop = asyncio.get_running_loop()
-
-    if os.path.exists(AUTH_TOKEN_FILE):
-        try:
-            with open(AUTH_TOKEN_FILE, "r") as f:
-                saved = json.load(f)
-                token = saved.get("auth")
-                if token:
-                    client.rest_client.cookie_jar.set_cookie(
-                        http.cookiejar.Cookie(
-                            version=0,
-                            name="auth",
-                            value=token,
-                            port=None,
-                            port_specified=False,
-                            domain="api.vrchat.cloud",
-                            domain_specified=True,
-                            domain_initial_dot=False,
-                            path="/",
-                            path_specified=True,
-                            secure=True,
-                            expires=None,
-                            discard=False,
-                            comment=None,
-                            comment_url=None,
-                            rest={},
-                            rfc2109=False
-                        )
-                    )
-
-                    user = await loop.run_in_executor(None, auth_api.get_current_user)
-                    print(f"[VRChat] Reused existing auth token as {user.display_name}")
-                    return user
-        except Exception as e:
-            logging.warning(f"[VRChat] Failed to use saved auth token: {e}")
-
-    try:
-        user = await loop.run_in_executor(None, auth_api.get_current_user)
-        print(f"[VRChat] Logged in as {user.display_name} (no 2FA required)")
-
-        for cookie in client.rest_client.cookie_jar:
-            if cookie.name == "auth":
-                with open(AUTH_TOKEN_FILE, "w") as f:
-                    json.dump({"auth": cookie.value}, f)
-                print("[VRChat] Saved new auth token")
-                break
-
-        return user
-
-    except UnauthorizedException as e:
-        body = getattr(e, "body", None)
-        if body:
-            try:
-                body_json = json.loads(body)
-                if "requiresTwoFactorAuth" in body_json:
-                    factors = body_json["requiresTwoFactorAuth"]
-
-                    if "emailOtp" in factors:
-                        code = input("[VRChat] Enter your VRChat Email 2FA code: ")
-                        await loop.run_in_executor(
-                            None,
-                            lambda: auth_api.verify2_fa_email_code(TwoFactorEmailCode(code=code))
-                        )
-                        user = await loop.run_in_executor(None, auth_api.get_current_user)
-                    elif "totp" in factors:
-                        code = input("[VRChat] Enter your VRChat Authenticator code: ")
-                        await loop.run_in_executor(None, lambda: auth_api.verify2_fa({"code": code}))
-                        user = await loop.run_in_executor(None, auth_api.get_current_user)
-
-                    for cookie in client.rest_client.cookie_jar:
-                        if cookie.name == "auth":
-                            with open(AUTH_TOKEN_FILE, "w") as f:
-                                json.dump({"auth": cookie.value}, f)
-                            print("[VRChat] Saved new auth token")
-                            break
-
-                    return user
-
-            except json.JSONDecodeError:
-                logging.error(f"[VRChat] Could not parse error body: {body}")
-
-        logging.error(f"[VRChat] Login failed: {e}")
-        raise
-
-
-async def ensure_connection():
-    while True:
-        try:
-            await login_vrc()
-        except Exception as ex:
-            logging.error(f"{ts()} [VRChat-Auth] Reconnect failed: {ex}")
-        await asyncio.sleep(300)
-
-
-async def fetch_group_events(group_id: str):
-    loop = asyncio.get_running_loop()
-    try:
-        result = await loop.run_in_executor(
-            None, lambda: calendar_api_instance.get_group_calendar_events(group_id)
-        )
-
-        events = getattr(result, "data", getattr(result, "results", []))
-        now = datetime.now(timezone.utc)
-        event_list = []
-
-        for e in events:
-            try:
-                start = datetime.fromisoformat(e.starts_at.replace("Z", "+00:00"))
-                end = datetime.fromisoformat(e.ends_at.replace("Z", "+00:00"))
-            except Exception:
-                start, end = e.starts_at, e.ends_at
-
-            if end >= now:
-                try:
-                    full_event = await loop.run_in_executor(
-                        None, lambda: calendar_api_instance.get_group_calendar_event(group_id, e.id)
-                    )
-                    platforms = getattr(full_event, "platforms", [])
-                    image = getattr(full_event, "image_url", None)
-                    tags = getattr(full_event, "tags", [])
-                except ApiException:
-                    platforms = []
-
-                event_list.append(
-                    {
-                        "group_id": group_id,
-                        "event_id": e.id,
-                        "title": e.title,
-                        "description": e.description,
-                        "start": e.starts_at,
-                        "end": e.ends_at,
-                        "category": e.category,
-                        "access_type": e.access_type,
-                        "platforms": platforms,
-                        "image": image,
-                        "tags": tags,
-                    }
-                )
-
-        print(f"{ts()} [VRChat-Calendar] Found {len(event_list)} events for {group_id}.")
-        return event_list
-
-    except Exception as ex:
-        logging.error(f"{ts()} [VRChat-Calendar] Failed to fetch events for {group_id}: {ex}")
-        return []
-
-
-async def fetch_vrc_events():
-    existing = load_existing_events()
-    new_entries = []
-    new_events = []
-
-    for gid in config.GROUP_IDS:
-        print(f"{ts()} [VRChat-Calendar] Fetching events for group {gid}...")
-        events = await fetch_group_events(gid)
-        await asyncio.sleep(1)
-
-        for e in events:
-            entry = f"{e['event_id']} from {e['group_id']}"
-            if entry not in existing:
-                new_entries.append(entry)
-                new_events.append(e)
-
-    if new_entries:
-        save_new_events(new_entries)
-        print(f"{ts()} [VRChat-Calendar] Added {len(new_entries)} new events.")
-        await send_to_website(new_events)
-    else:
-        print(f"{ts()} [VRChat-Calendar] No new events found")
-
-
-async def fetch_group_info(group_id: str):
-    loop = asyncio.get_running_loop()
-    try:
-        group = await loop.run_in_executor(None, lambda: groups_api_instance.get_group(group_id))
-        name = getattr(group, "name", None)
-
-        if not name:
-            print(f"{ts()} [VRChat-Group] No name found for {group_id}.")
-            return None
-
-        print(f"{ts()} [VRChat-Group] Found group '{name}' (ID: {group_id})")
-        return {"id": group_id, "name": name}
-    except Exception as e:
-        print(f"{ts()} [VRChat-Group] Failed to fetch info for {group_id}: {e}")
-        return None
-
-
-async def is_in_group(group_id: str):
-    loop = asyncio.get_running_loop()
-    bot_user_id = config.user_id
-
-    try:
-        await loop.run_in_executor(
-            None,
-            lambda: groups_api_instance.get_group_member(group_id, bot_user_id)
-        )
-        return True
-
-    except Exception as e:
-        if "404" in str(e) or "not found" in str(e).lower():
-            return False
-
-        print(f"[VRChat-Group] Failed membership check: {e}")
-        return False
-
-
-
-async def join_group(group_id: str):
-    loop = asyncio.get_running_loop()
-
-    try:
-        group = await loop.run_in_executor(
-            None,
-            lambda: groups_api_instance.join_group(group_id)
-        )
-        return group
-
-    except Exception as e:
-        print(f"[VRChat-Group] Failed to join group {group_id}: {e}")
-        return None
+import os, asyncio, json, time, http.cookiejar, requests, vrchatapi
+
+
+from vrchatapi.api import authentication_api, groups_api, calendar_api, users_api
+from vrchatapi.models.two_factor_email_code import TwoFactorEmailCode
+from vrchatapi.exceptions import UnauthorizedException, NotFoundException, ApiException
+
+
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+
+from data.ratelimit import limiter
+from data.executors import vrchat_io, console_input
+from data.sharding import HashRing
+from data import workers
+from data.logger import get_logger
+from data.cache import TTLCache
+from data import metrics
+from data.website.events import website_configured
+from data.event import Event, parse_datetime
+from data.outbox import outbox
+from data.event_store import get_event_store, diff_group_events
+import data.env_config as config
+
+
+config.VRC_USER
+config.VRC_PASS
+config.CONTACT
+config.GROUP_IDS
+config.VRC_ACCOUNTS
+config.SHARD_REPLICAS
+config.REAUTH_BEFORE_EXPIRY
+config.CALENDAR_PAGE_SIZE
+config.CALENDAR_HORIZON_DAYS
+
+
+# how often ensure_connection looks at the sessions; it makes no calls for healthy ones
+SESSION_CHECK_INTERVAL = 300
+# after a failed refresh, further 401s fail fast for this long instead of logging in again
+REFRESH_COOLDOWN = 60
+# calls waiting on a login (e.g. one stuck at a 2FA prompt) give up after this many seconds
+LOGIN_WAIT_TIMEOUT = 300
+
+
+AUTH_TOKEN_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "vrc_auth_token.json")
+
+
+log = get_logger("VRChat")
+auth_log = get_logger("VRChat-Auth")
+calendar_log = get_logger("VRChat-Calendar")
+group_log = get_logger("VRChat-Group")
+store_log = get_logger("EventStore")
+website_log = get_logger("Website")
+
+
+class VRChatSession:
+    """
+    One bot account: its own ApiClient (and with it its own cookie jar), token file and
+    rate budget. VRChat limits per account, so every session is paced separately.
+    """
+
+    def __init__(self, name, username, password, user_id=None, token_file=AUTH_TOKEN_FILE):
+        self.name = name
+        self.username = username
+        self.user_id = user_id
+        self.token_file = token_file
+        self.user = None
+        # bumped by every successful login, so a 401 can tell whether it predates the last one
+        self.generation = 0
+        self.login_task = None
+        self.login_failed_at = 0.0
+        self.memberships_task = None
+        # worker processes only borrow the bot's token and leave refreshing to it
+        self.refresh_on_401 = True
+
+        self.configuration = vrchatapi.Configuration(username=username, password=password)
+        self.client = vrchatapi.ApiClient(self.configuration)
+        self.client.user_agent = f"{config.CONTACT}"
+
+        self.auth_api = authentication_api.AuthenticationApi(self.client)
+        self.groups_api = groups_api.GroupsApi(self.client)
+        self.calendar_api = calendar_api.CalendarApi(self.client)
+        self.users_api = users_api.UsersApi(self.client)
+
+    @property
+    def rate_key(self):
+        """Limiter bucket for this account; the host is read each time so tests can repoint it."""
+        host = urlsplit(self.configuration.host).netloc
+        return host if self.name == "1" else f"{host}#{self.name}"
+
+    @property
+    def logged_in(self):
+        return self.user is not None
+
+    @property
+    def refreshing(self):
+        return self.login_task is not None and not self.login_task.done()
+
+    async def ready(self):
+        """
+        Wait for an in-flight login of this account, if there is one. Raises TimeoutError
+        after LOGIN_WAIT_TIMEOUT, so fetches fail instead of hanging on an unanswered prompt.
+        """
+        if self.refreshing:
+            # shielded so one cancelled or timed out caller doesn't abort the login the others wait on
+            await asyncio.wait_for(asyncio.shield(self.login_task), LOGIN_WAIT_TIMEOUT)
+
+    def token_expires(self):
+        """Unix time the auth cookie expires, or None if unknown (e.g. a token loaded from file)."""
+        for cookie in self.client.rest_client.cookie_jar:
+            if cookie.name == "auth":
+                return cookie.expires
+        return None
+
+    def __repr__(self):
+        return f"VRChatSession({self.name} {self.username})"
+
+
+def _token_file(name):
+    if name == "1":
+        return AUTH_TOKEN_FILE
+    return os.path.join(os.path.dirname(AUTH_TOKEN_FILE), f"vrc_auth_token_{name}.json")
+
+
+def build_sessions():
+    """(Re)create the account sessions from VRC_ACCOUNTS; worker processes call it again with the bot's settings."""
+    global sessions, sessions_by_name, default_session, shard_ring
+    global configuration, client, auth_api, groups_api_instance, calendar_api_instance, users_api_instance
+
+    sessions = [
+        VRChatSession(name, username, password, user_id, _token_file(name))
+        for name, username, password, user_id in config.VRC_ACCOUNTS
+    ]
+    sessions_by_name = {session.name: session for session in sessions}
+    default_session = sessions[0]
+    shard_ring = HashRing(list(sessions_by_name), config.SHARD_REPLICAS)
+
+    # the first account, under the names the rest of the bot has always used
+    configuration = default_session.configuration
+    client = default_session.client
+    auth_api = default_session.auth_api
+    groups_api_instance = default_session.groups_api
+    calendar_api_instance = default_session.calendar_api
+    users_api_instance = default_session.users_api
+
+
+build_sessions()
+
+
+group_timings = {}
+
+
+calendar_cache = TTLCache(config.CACHE_SIZE, config.CALENDAR_CACHE_TTL)
+detail_cache = TTLCache(config.CACHE_SIZE, config.DETAIL_CACHE_TTL)
+group_cache = TTLCache(config.CACHE_SIZE, config.GROUP_CACHE_TTL)
+membership_cache = TTLCache(config.CACHE_SIZE, config.MEMBERSHIP_CACHE_TTL)
+
+
+def apply_cache_settings():
+    """Resize the caches and set their TTLs from the current CACHE_SIZE / *_CACHE_TTL settings."""
+    for cache, ttl in (
+        (calendar_cache, config.CALENDAR_CACHE_TTL),
+        (detail_cache, config.DETAIL_CACHE_TTL),
+        (group_cache, config.GROUP_CACHE_TTL),
+        (membership_cache, config.MEMBERSHIP_CACHE_TTL),
+    ):
+        cache.maxsize = max(1, config.CACHE_SIZE)
+        cache.ttl = ttl
+        while len(cache.entries) > cache.maxsize:
+            cache.entries.popitem(last=False)
+
+
+async def vrc_call(fn, *args, session=None, reauth=True, **kwargs):
+    """
+    Run a blocking SDK call on the vrchat-io executor, paced by the VRChat budget and retried on 429.
+
+    `fn` must belong to `session`'s api instances (the first account by default), since
+    that is the budget it is paced by. A 401 refreshes the session (one login, however
+    many calls hit it) and replays the call once; login itself passes reauth=False.
+    """
+    session = session or default_session
+    op = getattr(fn, "__name__", str(fn)).replace("_with_http_info", "")
+    rate_key = session.rate_key
+    reauth = reauth and session.refresh_on_401
+    throttled = 0
+    replayed = False
+
+    while True:
+        if reauth:
+            await session.ready()
+        generation = session.generation
+
+        await limiter.acquire(rate_key, config.VRC_RATE)
+        started = time.perf_counter()
+        try:
+            with metrics.IN_FLIGHT.track_inprogress(upstream="vrchat"):
+                result = await vrchat_io.run(fn, *args, **kwargs)
+        except ApiException as ex:
+            metrics.observe_request("vrchat", op, ex.status, time.perf_counter() - started)
+            limiter.feedback(rate_key, ex.status, ex.headers)
+            if ex.status == 401 and reauth and not replayed:
+                auth_log.debug("%s was rejected (401) for account %s, replaying after a refresh.", op, session.name)
+                await refresh_session(session, generation)
+                replayed = True
+                continue
+            if ex.status != 429 or throttled == config.RATE_LIMIT_RETRIES:
+                raise
+            throttled += 1
+            log.warning("Throttled (429) on %s, backing off (attempt %s).", op, throttled)
+            continue
+        except Exception:
+            metrics.observe_request("vrchat", op, "error", time.perf_counter() - started)
+            raise
+
+        metrics.observe_request("vrchat", op, 200, time.perf_counter() - started)
+        limiter.feedback(rate_key, 200)
+        return result
+
+
+async def login_vrc(session=None, use_saved_token=True):
+    session = session or default_session
+    started = time.perf_counter()
+    try:
+        user = await _login_vrc(session, use_saved_token)
+    except Exception:
+        metrics.LOGINS.inc(outcome="failed")
+        session.login_failed_at = time.time()
+        raise
+    finally:
+        metrics.LOGIN_SECONDS.observe(time.perf_counter() - started)
+
+    metrics.LOGINS.inc(outcome="ok")
+    session.user = user
+    session.generation += 1
+    session.login_failed_at = 0.0
+    if not session.user_id:
+        session.user_id = getattr(user, "id", None)
+    return user
+
+
+async def refresh_session(session, seen_generation=None, reason="unauthorized"):
+    """
+    Log `session` in again, single-flight: callers arriving while a login runs wait for that
+    one, and a caller whose 401 predates the last successful login simply retries.
+    """
+    if seen_generation is not None and session.generation != seen_generation:
+        return
+    if not session.refreshing:
+        last = session.login_task
+        if reason == "unauthorized" and last is not None and time.time() - session.login_failed_at < REFRESH_COOLDOWN:
+            raise last.exception()
+
+        metrics.REAUTHS.inc(reason=reason)
+        auth_log.warning("Refreshing the session of account %s (%s).", session.name, reason)
+        # a rejected or expiring token is useless, only a failed start-up login may reuse the file
+        session.login_task = asyncio.ensure_future(login_vrc(session, use_saved_token=reason == "retry"))
+    await session.ready()
+
+
+async def login_all():
+    """
+    Log in every configured account. The first one has to succeed; an extra account that
+    fails is left out of sharding until ensure_connection gets it back.
+    """
+    user = await login_vrc(default_session)
+    for session in sessions[1:]:
+        try:
+            await login_vrc(session)
+        except Exception as ex:
+            auth_log.error("Login failed for account %s (%s): %s", session.name, session.username, ex)
+    return user
+
+
+def set_auth_cookie(session, token):
+    """Put a saved auth token into `session`'s cookie jar."""
+    session.client.rest_client.cookie_jar.set_cookie(
+        http.cookiejar.Cookie(
+            version=0,
+            name="auth",
+            value=token,
+            port=None,
+            port_specified=False,
+            domain="api.vrchat.cloud",
+            domain_specified=True,
+            domain_initial_dot=False,
+            path="/",
+            path_specified=True,
+            secure=True,
+            expires=None,
+            discard=False,
+            comment=None,
+            comment_url=None,
+            rest={},
+            rfc2109=False
+        )
+    )
+
+
+def _save_token(session):
+    for cookie in session.client.rest_client.cookie_jar:
+        if cookie.name == "auth":
+            with open(session.token_file, "w") as f:
+                json.dump({"auth": cookie.value}, f)
+            log.info("Saved new auth token")
+            break
+
+
+def _clear_auth_cookie(session):
+    """Forget the auth cookie but keep the rest (the twoFactorAuth cookie spares a 2FA prompt)."""
+    jar = session.client.rest_client.cookie_jar
+    for cookie in [c for c in jar if c.name == "auth"]:
+        jar.clear(cookie.domain, cookie.path, cookie.name)
+
+
+async def _login_vrc(session, use_saved_token=True):
+    auth_api = session.auth_api
+
+    if not use_saved_token:
+        _clear_auth_cookie(session)
+    elif os.path.exists(session.token_file):
+        try:
+            with open(session.token_file, "r") as f:
+                saved = json.load(f)
+                token = saved.get("auth")
+                if token:
+                    set_auth_cookie(session, token)
+
+                    user = await vrc_call(auth_api.get_current_user, session=session, reauth=False)
+                    log.info("Reused existing auth token as %s", user.display_name)
+                    return user
+        except Exception as e:
+            log.warning("Failed to use saved auth token: %s", e)
+
+    try:
+        user = await vrc_call(auth_api.get_current_user, session=session, reauth=False)
+        log.info("Logged in as %s (no 2FA required)", user.display_name)
+        _save_token(session)
+        return user
+
+    except UnauthorizedException as e:
+        body = getattr(e, "body", None)
+        if body:
+            try:
+                body_json = json.loads(body)
+                if "requiresTwoFactorAuth" in body_json:
+                    factors = body_json["requiresTwoFactorAuth"]
+
+                    if "emailOtp" in factors:
+                        code = await console_input.ask(f"[VRChat] Enter the VRChat Email 2FA code for {session.username}: ")
+                        await vrc_call(auth_api.verify2_fa_email_code, TwoFactorEmailCode(code=code), session=session, reauth=False)
+                        user = await vrc_call(auth_api.get_current_user, session=session, reauth=False)
+                    elif "totp" in factors:
+                        code = await console_input.ask(f"[VRChat] Enter the VRChat Authenticator code for {session.username}: ")
+                        await vrc_call(auth_api.verify2_fa, {"code": code}, session=session, reauth=False)
+                        user = await vrc_call(auth_api.get_current_user, session=session, reauth=False)
+
+                    _save_token(session)
+                    return user
+
+            except json.JSONDecodeError:
+                log.error("Could not parse error body: %s", body)
+
+        log.error("Login failed: %s", e)
+        raise
+
+
+async def cached_vrc_call(cache, key, fn_with_http_info, *args, session=None, **kwargs):
+    """
+    vrc_call through `cache`. Fresh entries are served locally; stale ones are revalidated
+    with If-None-Match when an ETag was seen, and a 304 just renews the cached value.
+    """
+    entry = cache.lookup(key)
+    if entry is not None and entry[2]:
+        cache.hits += 1
+        return entry[0]
+
+    cache.misses += 1
+    headers = {"If-None-Match": entry[1]} if entry is not None and entry[1] else {}
+
+    try:
+        data, _, response_headers = await vrc_call(fn_with_http_info, *args, _headers=headers, session=session, **kwargs)
+    except ApiException as ex:
+        if ex.status == 304 and entry is not None:
+            cache.touch(key)
+            return entry[0]
+        raise
+
+    cache.set(key, data, etag=(response_headers or {}).get("ETag"))
+    return data
+
+
+def auth_token(session=None):
+    """The current VRChat auth cookie value, or None before login."""
+    for cookie in (session or default_session).client.rest_client.cookie_jar:
+        if cookie.name == "auth":
+            return cookie.value
+    return None
+
+
+def invalidate_group(group_id: str):
+    """Drop everything cached about one group (calendar, details, info) and revalidate memberships."""
+    for cache in (calendar_cache, detail_cache, group_cache):
+        cache.invalidate_where(lambda key: key[0] == group_id)
+    # the membership index lists every group of an account, so it is asked again (with its ETag)
+    membership_cache.expire_where(lambda key: True)
+
+
+def clear_caches():
+    for cache in (calendar_cache, detail_cache, group_cache, membership_cache):
+        cache.clear()
+
+
+def cache_stats():
+    return {
+        "calendar": calendar_cache.stats(),
+        "details": detail_cache.stats(),
+        "groups": group_cache.stats(),
+        "membership": membership_cache.stats(),
+    }
+
+
+async def ensure_connection():
+    """
+    Keep the accounts logged in without polling VRChat. A 401 already refreshes a session
+    (see vrc_call); this only retries accounts whose login failed and renews auth cookies
+    that expire within REAUTH_BEFORE_EXPIRY.
+    """
+    while True:
+        await asyncio.sleep(SESSION_CHECK_INTERVAL)
+        for session in sessions:
+            expires = session.token_expires()
+            if not session.logged_in:
+                reason = "retry"
+            elif expires is not None and expires - time.time() < config.REAUTH_BEFORE_EXPIRY:
+                reason = "expiring"
+            else:
+                continue
+
+            try:
+                await refresh_session(session, reason=reason)
+            except Exception as ex:
+                auth_log.error("Reconnect failed for account %s: %s", session.name, ex)
+
+
+async def session_for(group_id: str):
+    """
+    The account that fetches `group_id`: the first one in hash-ring order that is logged in
+    and a member of the group. If none is, the ring owner still tries (public calendars).
+    """
+    if len(sessions) == 1:
+        return default_session
+
+    order = [sessions_by_name[name] for name in shard_ring.preference(group_id)]
+    for session in order:
+        if session.logged_in and await is_in_group(group_id, session=session):
+            return session
+
+    fallback = next((session for session in order if session.logged_in), order[0])
+    log.debug("No account is a member of %s, fetching it as account %s.", group_id, fallback.name)
+    return fallback
+
+
+def _has_details(e):
+    """True when the list payload already carries what the detail call would add."""
+    return bool(getattr(e, "platforms", None)) and getattr(e, "image_url", None) is not None and getattr(e, "tags", None) is not None
+
+
+async def fetch_event_details(group_id: str, events, session=None):
+    """
+    Fetch full event details concurrently (DETAIL_CONCURRENCY per group), in input order.
+
+    Returns (details, number of detail calls actually made). A lookup that failed comes
+    back as its ApiException, never as the bare list item: that one lacks the details, so
+    its fingerprint would differ from the stored one and flip back on the next sweep.
+    """
+    session = session or default_session
+    limit = asyncio.Semaphore(max(1, config.DETAIL_CONCURRENCY))
+    calls = 0
+
+    async def fetch_one(e):
+        if _has_details(e):
+            return e
+
+        # updated_at is part of the key, so an edited event never hits a stale entry
+        key = (group_id, e.id, str(getattr(e, "updated_at", None)))
+        cached = detail_cache.get(key)
+        if cached is not None:
+            return cached
+
+        nonlocal calls
+
+        async with limit:
+            calls += 1
+            try:
+                full_event = await vrc_call(session.calendar_api.get_group_calendar_event, group_id, e.id, session=session)
+                detail_cache.set(key, full_event)
+                return full_event
+            except ApiException as ex:
+                calendar_log.warning("Detail lookup failed for %s in %s: %s", e.id, group_id, ex.status)
+                return ex
+
+    details = await asyncio.gather(*(fetch_one(e) for e in events))
+    return details, calls
+
+
+def _record_group_fetch(group_id, timings, events):
+    """Keep a group fetch's timings and metrics; `events` is None for a failed fetch."""
+    group_timings[group_id] = timings
+    metrics.GROUP_FETCHES.inc(group=group_id, outcome="failed" if events is None else "ok")
+    metrics.GROUP_FETCH_SECONDS.observe(timings["total"], group=group_id)
+    if events is not None:
+        metrics.GROUP_EVENTS.set(len(events), group=group_id)
+
+
+def _page_results(page):
+    return getattr(page, "data", getattr(page, "results", [])) or []
+
+
+def _past_horizon(events, horizon):
+    """
+    True if a page says nothing before `horizon` can follow: it is in start order and even
+    its first event starts later. Unsorted pages never stop the listing early.
+    """
+    starts = [parse_datetime(e.starts_at) for e in events]
+    if not starts or horizon is None or None in starts:
+        return False
+    return starts == sorted(starts) and starts[0] > horizon
+
+
+async def _list_calendar(group_id, session, month=None, horizon=None):
+    """
+    Every event of one calendar listing (a single month if `month` is set), following its
+    pages. Returns (events, pages fetched).
+
+    The first page tells the total, so the rest load DETAIL_CONCURRENCY at a time; after
+    each round the listing stops early once a page starts past `horizon`.
+    """
+    size = max(1, min(100, config.CALENDAR_PAGE_SIZE))
+    label = month.strftime("%Y-%m") if month else None
+
+    async def page(offset):
+        kwargs = {"n": size, "offset": offset}
+        if month is not None:
+            kwargs["date"] = month
+        return await cached_vrc_call(
+            calendar_cache, (group_id, "calendar", label, offset),
+            session.calendar_api.get_group_calendar_events_with_http_info, group_id,
+            session=session, **kwargs,
+        )
+
+    first = await page(0)
+    events = list(_page_results(first))
+    pages = 1
+    total = getattr(first, "total_count", None)
+    has_next = getattr(first, "has_next", None)
+    last = events
+
+    if total is not None:
+        # offsets are known up front, so fetch them in overlapping rounds
+        offsets = list(range(size, total, size))
+        step = max(1, config.DETAIL_CONCURRENCY)
+        for i in range(0, len(offsets), step):
+            if _past_horizon(last, horizon):
+                break
+            batch = await asyncio.gather(*(page(offset) for offset in offsets[i:i + step]))
+            pages += len(batch)
+            for result in batch:
+                events.extend(_page_results(result))
+            last = _page_results(batch[-1])
+    else:
+        # no total: follow has_next (or full pages) one at a time
+        while last and (has_next or (has_next is None and len(last) >= size)) and not _past_horizon(last, horizon):
+            result = await page(pages * size)
+            pages += 1
+            last = _page_results(result)
+            has_next = getattr(result, "has_next", None)
+            events.extend(last)
+
+    return events, pages
+
+
+def _months(start, end):
+    month = datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+    while month <= end:
+        yield month
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _horizon(now):
+    """Latest start a fetch mirrors (CALENDAR_HORIZON_DAYS from `now`), or None for no limit."""
+    if config.CALENDAR_HORIZON_DAYS <= 0:
+        return None
+    return now + timedelta(days=config.CALENDAR_HORIZON_DAYS)
+
+
+async def list_group_calendar(group_id, session=None, now=None):
+    """
+    Upcoming events of a group's calendar, complete across pages. Returns (events, pages).
+
+    With CALENDAR_HORIZON_DAYS set only the months up to the horizon are asked for, so past
+    months are never downloaded, and events starting after the horizon are dropped.
+    """
+    session = session or default_session
+    now = now or datetime.now(timezone.utc)
+    horizon = _horizon(now)
+
+    if horizon is None:
+        listed, pages = await _list_calendar(group_id, session)
+    else:
+        listings = await asyncio.gather(*(
+            _list_calendar(group_id, session, month, horizon) for month in _months(now, horizon)
+        ))
+        listed = [e for events, _ in listings for e in events]
+        pages = sum(count for _, count in listings)
+
+    upcoming = {}
+    for e in listed:
+        end = parse_datetime(e.ends_at)
+        if end is not None and end < now:
+            continue
+        start = parse_datetime(e.starts_at)
+        if horizon is not None and start is not None and start > horizon:
+            continue
+        # pages (and months) can overlap when the calendar changes while we read it
+        upcoming.setdefault(e.id, e)
+
+    return list(upcoming.values()), pages
+
+
+async def fetch_group_events(group_id: str, session=None, fresh=False):
+    """Upcoming events of one group, or None if the fetch failed. `fresh` skips the cache TTL."""
+    session = session or default_session
+    if fresh:
+        # keep the ETags so an unchanged calendar costs 304s, not full downloads
+        calendar_cache.expire_where(lambda key: key[0] == group_id and key[1] == "calendar")
+
+    started = time.perf_counter()
+    try:
+        upcoming, pages = await list_group_calendar(group_id, session)
+        listed = time.perf_counter()
+
+        details, detail_calls = await fetch_event_details(group_id, upcoming, session)
+        finished = time.perf_counter()
+
+        failed = next((d for d in details if isinstance(d, ApiException)), None)
+        if failed is not None:
+            # a partial calendar would be diffed as edits; keep the stored state until a clean fetch
+            raise failed
+
+        event_list = [Event.from_vrchat(group_id, e, full_event) for e, full_event in zip(upcoming, details)]
+
+        _record_group_fetch(group_id, {
+            "list": listed - started,
+            "pages": pages,
+            "details": finished - listed,
+            "detail_calls": detail_calls,
+            "total": finished - started,
+        }, event_list)
+
+        calendar_log.info(
+            "Found %s events for %s (list %.2fs over %s pages, %s details %.2fs).",
+            len(event_list), group_id, listed - started, pages, detail_calls, finished - listed,
+        )
+        return event_list
+
+    except Exception as ex:
+        _record_group_fetch(group_id, {
+            "list": None,
+            "details": None,
+            "detail_calls": 0,
+            "total": time.perf_counter() - started,
+            "status": getattr(ex, "status", None),
+        }, None)
+        calendar_log.error("Failed to fetch events for %s: %s", group_id, ex)
+        return None
+
+
+async def fetch_vrc_events(group_ids=None, fresh=False):
+    """
+    Fetch the given groups (all of GROUP_IDS by default) and queue website writes for what changed.
+    `fresh` revalidates calendars even if they are still cached, e.g. after a pipeline message.
+
+    Returns {group_id: {"ok", "changed", "next_start"}} so callers can decide when to poll again.
+    """
+    metrics.SWEEPS.inc()
+    with metrics.SWEEP_IN_PROGRESS.track_inprogress(), metrics.SWEEP_SECONDS.time():
+        return await _fetch_vrc_events(group_ids, fresh)
+
+
+async def _fetch_in_worker(group_id, session, fresh):
+    """fetch_group_events in a worker process; the timings and metrics are kept on this side."""
+    for replay in (False, True):
+        try:
+            await session.ready()
+        except Exception:
+            pass  # the login failure is logged where it happened; the worker call will just fail
+        generation = session.generation
+        events, timings = await workers.fetch_group_events(group_id, session.name, auth_token(session), fresh)
+        if events is None and timings and timings.get("status") == 401 and not replay:
+            # the worker was handed a token VRChat no longer accepts; refresh here and resend
+            try:
+                await refresh_session(session, generation)
+            except Exception as ex:
+                auth_log.error("Session refresh for account %s failed: %s", session.name, ex)
+                break
+            continue
+        break
+
+    if timings is None:
+        timings = {"list": None, "details": None, "detail_calls": 0, "total": 0.0}
+    _record_group_fetch(group_id, timings, events)
+    return events
+
+
+def _diff_group(store, group_id, events, summary, horizon=None):
+    """
+    Diff one group's events against the store and return the resulting writes as
+    (op, group_id, event_id, event, website_id) tuples; `event` is None for deletes.
+    """
+    by_id = {e.event_id: e for e in events}
+    creates, updates, deletes, ended = diff_group_events(
+        store, group_id, {eid: e.fingerprint() for eid, e in by_id.items()},
+        horizon.timestamp() if horizon else None,
+    )
+
+    store.mark_seen(group_id, list(by_id))
+    for eid in ended:
+        store.remove(group_id, eid)
+
+    now = time.time()
+    summary[group_id] = {
+        "ok": True,
+        "changed": bool(creates or updates or deletes),
+        "next_start": min((e.starts_epoch for e in events if e.starts_epoch and e.starts_epoch > now), default=None),
+    }
+
+    ops = [("create", group_id, eid, by_id[eid], None) for eid in creates]
+    ops += [("update", group_id, eid, by_id[eid], store.get(group_id, eid).get("website_id")) for eid in updates]
+    ops += [("delete", group_id, eid, None, website_id) for eid, website_id in deletes]
+    return ops
+
+
+async def _confirm_removed(store, group_id, ops):
+    """
+    With a horizon, an event missing from the listing may just have moved past it. Look each
+    delete up: only a 404 is a removal. An event that still exists is kept and its stored end
+    moved along, so once it lies past the horizon later sweeps skip it without a lookup.
+    """
+    session = await session_for(group_id)
+    kept = []
+
+    async def check(op):
+        _, gid, eid, _, _ = op
+        try:
+            event = await vrc_call(session.calendar_api.get_group_calendar_event, gid, eid, session=session)
+        except NotFoundException:
+            kept.append(op)
+            return
+        except Exception as ex:
+            # unsure is not removed; the next sweep asks again
+            calendar_log.warning("Could not confirm %s in %s was removed: %s", eid, gid, ex)
+            return
+
+        record = store.get(gid, eid)
+        if record is not None:
+            end = parse_datetime(event.ends_at)
+            store.put(gid, eid, record["hash"], expires_at=end.timestamp() if end else None)
+        calendar_log.debug("Event %s of %s is still there (past the horizon), keeping it.", eid, gid)
+
+    # a delete without a website id only forgets a store record; no lookup is worth it
+    writes = [op for op in ops if op[0] != "delete" or op[4] is None]
+    await asyncio.gather(*(check(op) for op in ops if op[0] == "delete" and op[4] is not None))
+    return writes + kept
+
+
+def _queue_writes(store, ops):
+    """Hand writes to the outbox, or just record them when there is no website to mirror to."""
+    if not website_configured():
+        for op, gid, eid, event, _ in ops:
+            if op == "delete":
+                store.remove(gid, eid)
+            else:
+                store.put(gid, eid, event.fingerprint(), expires_at=event.ends_epoch)
+        return
+
+    for op, gid, eid, event, website_id in ops:
+        if op == "update" and website_id is None:
+            website_log.warning("No website id known for %s, recording change without pushing.", eid)
+            store.put(gid, eid, event.fingerprint(), expires_at=event.ends_epoch)
+        elif op == "delete" and website_id is None:
+            website_log.info("Event %s from %s was removed upstream but has no known website id.", eid, gid)
+            store.remove(gid, eid)
+        elif op == "delete":
+            outbox.enqueue(op, gid, eid, website_id=website_id)
+        else:
+            outbox.enqueue(
+                op, gid, eid,
+                payload=event.payload(),
+                website_id=website_id,
+                fingerprint=event.fingerprint(),
+                expires_at=event.ends_epoch,
+            )
+
+    outbox.save()
+
+
+async def _fetch_vrc_events(group_ids, fresh):
+    """
+    Streaming sweep: fetch -> normalize/dedup -> push, joined by bounded queues.
+
+    A group's changes reach the outbox (and the website) as soon as that group is fetched,
+    and at most PIPELINE_QUEUE_SIZE fetched groups / write batches wait between stages,
+    so memory stays flat however many groups there are.
+    """
+    store = get_event_store()
+
+    group_ids = list(config.GROUP_IDS if group_ids is None else group_ids)
+    queue_size = max(1, config.PIPELINE_QUEUE_SIZE)
+    batch_size = max(1, config.EVENT_BATCH_SIZE)
+
+    fetched = asyncio.Queue(maxsize=queue_size)
+    writes = asyncio.Queue(maxsize=queue_size)
+
+    summary = {}
+    counts = {"create": 0, "update": 0, "delete": 0}
+
+    in_workers = workers.enabled()
+    if in_workers:
+        workers.start({session.name: session.configuration.host for session in sessions})
+
+    async def fetch_worker(session, pending):
+        while not pending.empty():
+            gid = pending.get_nowait()
+            calendar_log.debug("Fetching events for group %s as account %s...", gid, session.name)
+            if in_workers:
+                events = await _fetch_in_worker(gid, session, fresh)
+            else:
+                events = await fetch_group_events(gid, session, fresh)
+            await fetched.put((gid, events))
+
+    async def fetch_stage():
+        # every account has its own rate budget, so each shard gets its own workers
+        shards = {}
+        for gid, session in zip(group_ids, await asyncio.gather(*(session_for(gid) for gid in group_ids))):
+            shards.setdefault(session, asyncio.Queue()).put_nowait(gid)
+        if len(sessions) > 1:
+            calendar_log.debug("Shards: %s", ", ".join(f"account {s.name} {q.qsize()}" for s, q in shards.items()))
+
+        # with worker processes, keep at least one group queued per process
+        concurrency = max(1, config.FETCH_CONCURRENCY, config.FETCH_PROCESSES if in_workers else 0)
+        await asyncio.gather(*(
+            fetch_worker(session, pending)
+            for session, pending in shards.items()
+            for _ in range(min(pending.qsize(), concurrency))
+        ))
+        await fetched.put(None)
+
+    async def diff_stage():
+        while True:
+            item = await fetched.get()
+            if item is None:
+                break
+
+            gid, events = item
+            if events is None:
+                # a failed fetch says nothing about what was removed upstream
+                summary[gid] = {"ok": False, "changed": False, "next_start": None}
+                continue
+
+            horizon = _horizon(datetime.now(timezone.utc))
+            ops = _diff_group(store, gid, events, summary, horizon)
+            if horizon is not None and any(op[0] == "delete" for op in ops):
+                ops = await _confirm_removed(store, gid, ops)
+            for op in ops:
+                counts[op[0]] += 1
+            if ops:
+                await writes.put(ops)
+
+        await writes.put(None)
+
+    async def push_stage():
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            ops = await writes.get()
+            if ops is None:
+                break
+
+            # linger briefly for more groups so creates still go out in full batches
+            deadline = loop.time() + config.PUSH_LINGER
+            while len(ops) < batch_size:
+                try:
+                    more = await asyncio.wait_for(writes.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if more is None:
+                    done = True
+                    break
+                ops = ops + more
+
+            _queue_writes(store, ops)
+            await outbox.deliver_due()
+
+    stages = [asyncio.ensure_future(stage()) for stage in (fetch_stage, diff_stage, push_stage)]
+    try:
+        await asyncio.gather(*stages)
+    except Exception:
+        # one stage died: stop the others instead of leaving them blocked on a full queue
+        for stage in stages:
+            stage.cancel()
+        raise
+
+    slowest = sorted(
+        ((gid, group_timings[gid]["total"]) for gid in group_ids if gid in group_timings),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:3]
+    if slowest:
+        calendar_log.info("Slowest groups: %s", ", ".join(f"{gid} {secs:.2f}s" for gid, secs in slowest))
+
+    metrics.EVENT_CHANGES.inc(counts["create"], kind="create")
+    metrics.EVENT_CHANGES.inc(counts["update"], kind="update")
+    metrics.EVENT_CHANGES.inc(counts["delete"], kind="delete")
+
+    pruned = store.prune_expired(config.EVENT_RETENTION_HOURS * 3600)
+    if pruned:
+        store_log.info("Pruned %s ended events.", pruned)
+    store.save()
+
+    if any(counts.values()):
+        calendar_log.info("%s new, %s changed, %s removed events.", counts["create"], counts["update"], counts["delete"])
+    else:
+        calendar_log.info("No new or changed events found")
+
+    # in group_ids order, like the callers expect
+    return {gid: summary[gid] for gid in group_ids if gid in summary}
+
+
+async def fetch_group_info(group_id: str):
+    try:
+        group = await cached_vrc_call(group_cache, (group_id, "info"), groups_api_instance.get_group_with_http_info, group_id)
+        name = getattr(group, "name", None)
+
+        if not name:
+            group_log.warning("No name found for %s.", group_id)
+            return None
+
+        group_log.info("Found group '%s' (ID: %s)", name, group_id)
+        return {"id": group_id, "name": name}
+    except Exception as e:
+        group_log.warning("Failed to fetch info for %s: %s", group_id, e)
+        return None
+
+
+async def group_memberships(session=None):
+    """
+    Ids of every group the account is a member of, from one get_user_groups listing that is
+    kept for MEMBERSHIP_CACHE_TTL. Callers arriving while it loads share the same request.
+    """
+    session = session or default_session
+    task = session.memberships_task
+    if task is None or task.done():
+        task = session.memberships_task = asyncio.ensure_future(cached_vrc_call(
+            membership_cache, (session.user_id, "groups"),
+            session.users_api.get_user_groups_with_http_info, session.user_id,
+            session=session,
+        ))
+    groups = await asyncio.shield(task)
+    return {g.group_id for g in groups or []}
+
+
+async def is_in_group(group_id: str, session=None):
+    try:
+        return group_id in await group_memberships(session)
+    except Exception as e:
+        group_log.warning("Failed membership check: %s", e)
+        return False
+
+
+async def member_session(group_id: str):
+    """The account that fetches `group_id` if any bot account is a member of it, else None."""
+    session = await session_for(group_id)
+    return session if await is_in_group(group_id, session=session) else None
+
+
+async def join_group(group_id: str, session=None):
+    session = session or default_session
+    try:
+        group = await vrc_call(session.groups_api.join_group, group_id, session=session)
+        invalidate_group(group_id)
+        return group
+
+    except Exception as e:
+        group_log.warning("Failed to join group %s: %s", group_id, e)
+        return None
@@ -0,0 +1,129 @@
+import time, functools, requests
+
+
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+
+
+from data.ratelimit import limiter
+from data.executors import BoundedExecutor
+from data.metrics import IN_FLIGHT, observe_request
+from data.logger import get_logger
+import data.env_config as config
+
+
+config.CONTACT
+config.API_KEY
+config.WEBSITE_POOL_SIZE
+config.WEBSITE_CONNECT_TIMEOUT
+config.WEBSITE_READ_TIMEOUT
+config.RATE_LIMIT_RETRIES
+config.LOG_BODY_LIMIT
+
+
+log = get_logger("Website")
+
+
+class WebsiteClient:
+    """
+    One keep-alive session shared by every website call.
+
+    requests is blocking, so calls run on the website-io executor sized to the connection
+    pool; a slow website only ties up these threads, never the event loop or VRChat calls.
+    """
+
+    def __init__(self, pool_size, connect_timeout, read_timeout):
+        self.pool_size = max(1, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = BoundedExecutor("website-io", self.pool_size)
+
+    def headers(self, with_body=True):
+        # read config on every call so reload_env api_key takes effect immediately
+        headers = {
+            "x-api-key": config.API_KEY,
+            "user-agent": str(config.CONTACT),
+        }
+        if with_body:
+            headers["content-type"] = "application/json"
+        return headers
+
+    async def request(self, method, url, json_body=None):
+        """Send one request, paced by the host's budget and retried while the website answers 429."""
+        host = urlsplit(url).netloc
+
+        for attempt in range(config.RATE_LIMIT_RETRIES + 1):
+            await limiter.acquire(host)
+            call = functools.partial(
+                self.session.request,
+                method,
+                url,
+                headers=self.headers(with_body=json_body is not None),
+                json=json_body,
+                timeout=self.timeout,
+            )
+            started = time.perf_counter()
+            with IN_FLIGHT.track_inprogress(upstream="website"):
+                try:
+                    response = await self.executor.run(call)
+                except Exception:
+                    observe_request("website", method, "error", time.perf_counter() - started)
+                    raise
+            observe_request("website", method, response.status_code, time.perf_counter() - started)
+
+            if not limiter.feedback(host, response.status_code, response.headers):
+                return response
+            log.warning("Throttled (429) on %s %s, backing off (attempt %s).", method, url, attempt + 1)
+
+        return response
+
+    async def get(self, url):
+        return await self.request("GET", url)
+
+    async def post(self, url, json_body):
+        return await self.request("POST", url, json_body)
+
+    async def put(self, url, json_body):
+        return await self.request("PUT", url, json_body)
+
+    async def delete(self, url):
+        return await self.request("DELETE", url)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class _ResponseBody:
+    __slots__ = ("response",)
+
+    def __init__(self, response):
+        self.response = response
+
+    def __str__(self):
+        text = self.response.text or "<no response body>"
+        limit = config.LOG_BODY_LIMIT
+        if limit and len(text) > limit:
+            return f"{text[:limit]}... ({len(text)} chars)"
+        return text
+
+
+def describe_response(response):
+    """
+    Response body for log lines, cut to LOG_BODY_LIMIT characters.
+
+    The text is only built when a log line is actually emitted, so bodies cost nothing below the log level.
+    """
+    return _ResponseBody(response)
+
+
+website_client = WebsiteClient(
+    config.WEBSITE_POOL_SIZE,
+    config.WEBSITE_CONNECT_TIMEOUT,
+    config.WEBSITE_READ_TIMEOUT,
+)
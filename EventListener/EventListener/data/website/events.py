@@ -1,182 +1,346 @@
-import os, json, requests, asyncio
-
-
-from data.extra import ts, fmt_date
-import data.env_config as config
-
-
-config.CONTACT
-config.API_KEY
-config.ENDPOINT_BASE_EVENT
-
-
-async def send_to_website(events):
-    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping website sending (no endpoint/API key).")
-        return
-
-    headers = {
-        "content-type": "application/json",
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
-    sent_count = 0
-
-    for e in events:
-        payload = {
-            "vrc_group_id": str(e["group_id"]),
-            "vrc_event_id": str(e["event_id"]),
-            "name": str(e["title"]),
-            "description": str(e["description"]),
-            "starts_at": fmt_date(e["start"]),
-            "ends_at": fmt_date(e["end"]),
-            "category": str(e["category"]),
-            "access_type": str(e["access_type"]),
-            "platforms": [str(p) for p in e.get("platforms", [])],
-            "image_url": str(e["image"]) if e.get("image") else None,
-            "tags": [str(t) for t in e.get("tags", [])] if e.get("tags") else None,
-        }
-
-        print(f"{ts()} [Website] Sending event: {e['event_id']} from {e['group_id']}")
-
-        try:
-            response = requests.post(config.ENDPOINT_BASE_EVENT, headers=headers, json=payload, timeout=90)
-
-            try:
-                response_text = json.dumps(response.json(), indent=2)
-            except Exception:
-                response_text = response.text or "<no response body>"
-
-            if response.status_code in (200, 201):
-                sent_count += 1
-                print(f"{ts()} [Website] Sent event {e['event_id']}.\n[Website Response] {response_text}")
-            else:
-                print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
-
-        except Exception as ex:
-            print(f"{ts()} [Website] Error sending {e['event_id']}: {ex}")
-
-        await asyncio.sleep(2)
-
-    print(f"{ts()} [Website] Finished sending {sent_count}/{len(events)} events.")
-
-
-async def add_event_to_api(group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url=None, tags=None):
-    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping event creation (no endpoint/API key).")
-        return
-
-    payload = {
-        "vrc_group_id": group_id,
-        "vrc_event_id": vrc_event_id,
-        "name": name,
-        "description": description,
-        "starts_at": fmt_date(starts_at),
-        "ends_at": fmt_date(ends_at),
-        "category": category,
-        "access_type": access_type,
-        "platforms": platforms,
-        "image_url": image_url,
-        "tags": tags,
-    }
-
-    headers = {
-        "content-type": "application/json",
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
-    print(f"{ts()} [Website] Creating event '{name}' ({vrc_event_id})...")
-
-    try:
-        response = requests.post(config.ENDPOINT_BASE_EVENT, headers=headers, json=payload, timeout=90)
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
-
-        if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Successfully created event.\n[Website Response] {response_text}")
-        else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
-
-    except Exception as ex:
-        print(f"{ts()} [Website] Error creating event: {ex}")
-
-
-async def update_event_on_api(website_id, group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url=None, tags=None):
-    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping event update (no endpoint/API key).")
-        return
-
-    endpoint = f"{config.ENDPOINT_BASE_EVENT}/{website_id}"
-
-    payload = {
-        "vrc_group_id": group_id,
-        "vrc_event_id": vrc_event_id,
-        "name": name,
-        "description": description,
-        "starts_at": fmt_date(starts_at),
-        "ends_at": fmt_date(ends_at),
-        "category": category,
-        "access_type": access_type,
-        "platforms": platforms,
-        "image_url": image_url,
-        "tags": tags,
-    }
-
-    headers = {
-        "content-type": "application/json",
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
-    print(f"{ts()} [Website] Updating event '{name}' ({vrc_event_id}) at {endpoint}...")
-
-    try:
-        response = requests.put(endpoint, headers=headers, json=payload, timeout=90)
-
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
-
-        if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Successfully updated event.\n[Website Response] {response_text}")
-        else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
-
-    except Exception as ex:
-        print(f"{ts()} [Website] Error updating event: {ex}")
-
-
-async def delete_event_on_api(website_id):
-    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping event deletion (no endpoint/API key).")
-        return
-
-    endpoint = f"{config.ENDPOINT_BASE_EVENT}/{website_id}"
-
-    headers = {
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
-    print(f"{ts()} [Website] Deleting event {website_id}...")
-
-    try:
-        response = requests.delete(endpoint, headers=headers, timeout=90)
-
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
-
-        if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Successfully deleted.\n[Website Response] {response_text}")
-        else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
-
-    except Exception as ex:
-        print(f"{ts()} [Website] Error deleting event: {ex}")
+from urllib.parse import urljoin
+
+
+from data.website.client import website_client, describe_response
+from data.event import Event
+from data.logger import get_logger
+from data.metrics import EVENTS_PUSHED
+import data.env_config as config
+
+
+config.CONTACT
+config.API_KEY
+config.ENDPOINT_BASE_EVENT
+config.ENDPOINT_BULK_EVENT
+config.EVENT_BATCH_SIZE
+
+
+log = get_logger("Website")
+
+
+_bulk_route_missing = False
+
+
+def website_configured():
+    return bool(config.ENDPOINT_BASE_EVENT and config.API_KEY)
+
+
+def website_id_from_response(body):
+    """Pull the website's own event id out of a create response, if it sent one."""
+    if not isinstance(body, dict):
+        return None
+
+    for key in ("id", "_id", "event_id"):
+        if body.get(key) is not None:
+            return str(body[key])
+
+    nested = body.get("data") or body.get("event")
+    if isinstance(nested, dict):
+        return website_id_from_response(nested)
+    return None
+
+
+def _payload_key(payload):
+    return (payload["vrc_group_id"], payload["vrc_event_id"])
+
+
+def _listing_total(body):
+    """The total item count a listing response reports, or None if it doesn't send one."""
+    if not isinstance(body, dict):
+        return None
+    meta = body.get("meta") if isinstance(body.get("meta"), dict) else {}
+    for value in (body.get("count"), body.get("total"), body.get("totalCount"), body.get("total_count"), meta.get("total")):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def _listing_next(body):
+    """The next-page link of a listing response (next, next_page_url or links.next), or None."""
+    if not isinstance(body, dict):
+        return None
+    links = body.get("links") if isinstance(body.get("links"), dict) else {}
+    for value in (body.get("next"), body.get("next_page_url"), links.get("next")):
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+async def list_events_on_api():
+    """
+    Every event the website has, following next-page links. Returns (items, complete):
+    items are dicts with at least id, vrc_group_id and vrc_event_id, and complete is True
+    only if the website reported a total and that many items were read. (None, False) if
+    the listing could not be read.
+    """
+    if not website_configured():
+        log.info("Skipping event listing (no endpoint/API key).")
+        return None, False
+
+    events = []
+    read = 0
+    total = None
+    url = config.ENDPOINT_BASE_EVENT
+    seen = set()
+
+    while url and url not in seen:
+        seen.add(url)
+        try:
+            response = await website_client.get(url)
+            body = response.json()
+        except Exception as ex:
+            log.error("Error listing events: %s", ex)
+            return None, False
+
+        items = _bulk_items(body)
+        if response.status_code != 200 or items is None:
+            log.warning("Failed to list events (%s): %s", response.status_code, describe_response(response))
+            return None, False
+
+        read += len(items)
+        if total is None:
+            total = _listing_total(body)
+        events += [item for item in items if isinstance(item, dict) and item.get("vrc_event_id") is not None]
+
+        next_url = _listing_next(body)
+        url = urljoin(url, next_url) if next_url else None
+
+    return events, total is not None and read == total
+
+
+async def _post_single(payload, sent):
+    group_id, event_id = _payload_key(payload)
+
+    log.debug("Sending event: %s from %s", event_id, group_id)
+
+    try:
+        response = await website_client.post(config.ENDPOINT_BASE_EVENT, payload)
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        response_text = describe_response(response)
+
+        if response.status_code in (200, 201):
+            sent[(group_id, event_id)] = website_id_from_response(body)
+            log.info("Sent event %s.", event_id)
+            log.debug("[Website Response] %s", response_text)
+        else:
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+
+    except Exception as ex:
+        log.error("Error sending %s: %s", event_id, ex)
+
+
+def _bulk_items(body):
+    """The per-item result list of a bulk response, or None if the website didn't send one."""
+    if isinstance(body, list):
+        return body
+    if isinstance(body, dict):
+        for key in ("results", "events", "items", "data"):
+            if isinstance(body.get(key), list):
+                return body[key]
+    return None
+
+
+def _bulk_item_ok(item):
+    if not isinstance(item, dict):
+        return bool(item)
+    if item.get("error") or item.get("success") is False:
+        return False
+    status = item.get("status")
+    return status is None or status in (200, 201) or str(status).lower() in ("ok", "created", "success")
+
+
+async def _post_batch(chunk, sent):
+    """POST one chunk to the bulk route. Returns False if the website has no bulk route."""
+    global _bulk_route_missing
+
+    log.info("Sending batch of %s events...", len(chunk))
+
+    try:
+        response = await website_client.post(config.ENDPOINT_BULK_EVENT, {"events": chunk})
+    except Exception as ex:
+        log.error("Error sending batch: %s", ex)
+        return True
+
+    if response.status_code in (404, 405, 501):
+        _bulk_route_missing = True
+        log.info("Bulk route unavailable (%s), falling back to single posts.", response.status_code)
+        return False
+
+    if response.status_code not in (200, 201, 207):
+        log.warning("Batch failed (%s): %s", response.status_code, describe_response(response))
+        return True
+
+    try:
+        items = _bulk_items(response.json())
+    except ValueError:
+        items = None
+
+    if items is None:
+        # accepted as a whole, no per-item detail to go on
+        for payload in chunk:
+            sent[_payload_key(payload)] = None
+        return True
+
+    by_key = {
+        (str(item.get("vrc_group_id")), str(item.get("vrc_event_id"))): item
+        for item in items
+        if isinstance(item, dict) and item.get("vrc_event_id") is not None
+    }
+
+    for i, payload in enumerate(chunk):
+        key = _payload_key(payload)
+        item = by_key.get(key)
+        if item is None and not by_key and i < len(items):
+            item = items[i]
+
+        if item is not None and _bulk_item_ok(item):
+            sent[key] = website_id_from_response(item)
+        else:
+            log.warning("Batch item %s from %s rejected: %s", key[1], key[0], item)
+
+    return True
+
+
+async def send_to_website(payloads):
+    """POST new event payloads. Returns {(group_id, event_id): website_id} for every one that was accepted."""
+    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
+        log.info("Skipping website sending (no endpoint/API key).")
+        return {}
+
+    sent = {}
+    remaining = list(payloads)
+
+    if config.ENDPOINT_BULK_EVENT and not _bulk_route_missing:
+        size = max(1, config.EVENT_BATCH_SIZE)
+        # a missing bulk route leaves the rest of `remaining` for single posts
+        while remaining and await _post_batch(remaining[:size], sent):
+            remaining = remaining[size:]
+
+    for payload in remaining:
+        await _post_single(payload, sent)
+
+    EVENTS_PUSHED.inc(len(sent), op="create", outcome="ok")
+    EVENTS_PUSHED.inc(len(payloads) - len(sent), op="create", outcome="failed")
+    log.info("Finished sending %s/%s events.", len(sent), len(payloads))
+    return sent
+
+
+# statuses that leave an event gone from the website: 404 means someone got there first
+UPDATED = (200, 201)
+DELETED = (200, 201, 204, 404)
+
+
+async def _put_event(website_id, payload):
+    """PUT one ready-made payload to the website. Returns the status code, None if the request failed."""
+    endpoint = f"{config.ENDPOINT_BASE_EVENT}/{website_id}"
+
+    log.debug("Updating event '%s' (%s) at %s...", payload["name"], payload["vrc_event_id"], endpoint)
+
+    try:
+        response = await website_client.put(endpoint, payload)
+
+        response_text = describe_response(response)
+
+        if response.status_code in UPDATED:
+            log.info("Successfully updated event.")
+            log.debug("[Website Response] %s", response_text)
+            EVENTS_PUSHED.inc(op="update", outcome="ok")
+        elif response.status_code == 404:
+            log.info("Event %s is no longer on the website (404).", website_id)
+            EVENTS_PUSHED.inc(op="update", outcome="missing")
+        else:
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+            EVENTS_PUSHED.inc(op="update", outcome="failed")
+        return response.status_code
+
+    except Exception as ex:
+        log.error("Error updating event: %s", ex)
+
+    EVENTS_PUSHED.inc(op="update", outcome="failed")
+    return None
+
+
+async def push_event_updates(changes):
+    """
+    PUT changed events. `changes` is a list of (website_id, payload); returns
+    {(group_id, event_id): status code, None if the request failed} for each of them.
+    """
+    statuses = {}
+    if not website_configured():
+        log.info("Skipping event update (no endpoint/API key).")
+        return statuses
+
+    for website_id, payload in changes:
+        statuses[_payload_key(payload)] = await _put_event(website_id, payload)
+
+    return statuses
+
+
+async def add_event_to_api(group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url=None, tags=None):
+    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
+        log.info("Skipping event creation (no endpoint/API key).")
+        return
+
+    event = Event(group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url, tags)
+
+    log.debug("Creating event '%s' (%s)...", name, vrc_event_id)
+
+    try:
+        response = await website_client.post(config.ENDPOINT_BASE_EVENT, event.payload())
+        response_text = describe_response(response)
+
+        if response.status_code in (200, 201):
+            log.info("Successfully created event.")
+            log.debug("[Website Response] %s", response_text)
+        else:
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+
+    except Exception as ex:
+        log.error("Error creating event: %s", ex)
+
+
+async def update_event_on_api(website_id, group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url=None, tags=None):
+    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
+        log.info("Skipping event update (no endpoint/API key).")
+        return None
+
+    event = Event(group_id, vrc_event_id, name, description, starts_at, ends_at, category, access_type, platforms, image_url, tags)
+    return await _put_event(website_id, event.payload())
+
+
+async def delete_event_on_api(website_id):
+    """DELETE one event. Returns the status code (see DELETED), None if the request failed or was skipped."""
+    if not config.ENDPOINT_BASE_EVENT or not config.API_KEY:
+        log.info("Skipping event deletion (no endpoint/API key).")
+        return None
+
+    endpoint = f"{config.ENDPOINT_BASE_EVENT}/{website_id}"
+
+    log.debug("Deleting event %s...", website_id)
+
+    try:
+        response = await website_client.delete(endpoint)
+
+        response_text = describe_response(response)
+
+        if response.status_code == 404:
+            log.info("Event %s was already gone from the website (404).", website_id)
+            EVENTS_PUSHED.inc(op="delete", outcome="missing")
+        elif response.status_code in DELETED:
+            log.info("Successfully deleted.")
+            log.debug("[Website Response] %s", response_text)
+            EVENTS_PUSHED.inc(op="delete", outcome="ok")
+        else:
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+            EVENTS_PUSHED.inc(op="delete", outcome="failed")
+        return response.status_code
+
+    except Exception as ex:
+        log.error("Error deleting event: %s", ex)
+
+    EVENTS_PUSHED.inc(op="delete", outcome="failed")
+    return None
@@ -1,7 +1,9 @@
-import os, json, requests, asyncio
+from urllib.parse import urljoin
 
 
-from data.extra import ts
+from data.website.client import website_client, describe_response
+from data.logger import get_logger
+from data.metrics import GROUP_OPS
 import data.env_config as config
 
 
@@ -10,109 +12,150 @@ config.ENDPOINT_BASE_GROUP
 config.API_KEY
 
 
-async def add_group_to_api(vrc_group_id: str, name: str):
+log = get_logger("Website")
+
+
+def _group_items(body):
+    """The group list of a listing response (a bare list or wrapped in results/groups/data/items)."""
+    if isinstance(body, list):
+        return body
+    if isinstance(body, dict):
+        for key in ("results", "groups", "data", "items"):
+            if isinstance(body.get(key), list):
+                return body[key]
+    return None
+
+
+async def list_groups_on_api():
+    """
+    {vrc_group_id: name} of every group the website has, following `next` links if the
+    listing is paged. None if it could not be read.
+    """
     if not config.ENDPOINT_BASE_GROUP or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping group creation (no endpoint/API key).")
-        return
+        log.info("Skipping group listing (no endpoint/API key).")
+        return None
+
+    groups = {}
+    url = config.ENDPOINT_BASE_GROUP
+    seen = set()
+
+    while url and url not in seen:
+        seen.add(url)
+        try:
+            response = await website_client.get(url)
+            body = response.json()
+        except Exception as ex:
+            log.error("Error listing groups: %s", ex)
+            return None
+
+        items = _group_items(body)
+        if response.status_code != 200 or items is None:
+            log.warning("Failed to list groups (%s): %s", response.status_code, describe_response(response))
+            return None
+
+        for item in items:
+            if isinstance(item, dict) and item.get("vrc_group_id"):
+                groups[str(item["vrc_group_id"])] = item.get("name")
+
+        next_url = body.get("next") if isinstance(body, dict) else None
+        url = urljoin(url, next_url) if isinstance(next_url, str) and next_url else None
+
+    return groups
 
-    headers = {
-        "content-type": "application/json",
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
+
+async def add_group_to_api(vrc_group_id: str, name: str):
+    if not config.ENDPOINT_BASE_GROUP or not config.API_KEY:
+        log.info("Skipping group creation (no endpoint/API key).")
+        return False
 
     payload = {
         "vrc_group_id": str(vrc_group_id),
         "name": str(name),
     }
 
-    print(f"{ts()} [Website] Creating group '{name}' ({vrc_group_id})...")
+    log.info("Creating group '%s' (%s)...", name, vrc_group_id)
 
     try:
-        response = requests.post(config.ENDPOINT_BASE_GROUP, headers=headers, json=payload, timeout=90)
+        response = await website_client.post(config.ENDPOINT_BASE_GROUP, payload)
 
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
+        response_text = describe_response(response)
 
         if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Group created.\n[Website Response] {response_text}")
+            log.info("Group created.")
+            log.debug("[Website Response] %s", response_text)
+            GROUP_OPS.inc(op="create", outcome="ok")
+            return True
         else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+            GROUP_OPS.inc(op="create", outcome="failed")
 
     except Exception as ex:
-        print(f"{ts()} [Website] Error creating group: {ex}")
+        log.error("Error creating group: %s", ex)
+        GROUP_OPS.inc(op="create", outcome="failed")
+
+    return False
 
 
 async def update_group_on_api(vrc_group_id: str, name: str):
     if not config.ENDPOINT_BASE_GROUP or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping group update (no endpoint/API key).")
-        return
+        log.info("Skipping group update (no endpoint/API key).")
+        return False
 
     endpoint = f"{config.ENDPOINT_BASE_GROUP}/{vrc_group_id}"
 
-    headers = {
-        "content-type": "application/json",
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
     payload = {
         "vrc_group_id": str(vrc_group_id),
         "name": str(name),
     }
 
-    print(f"{ts()} [Website] Updating group '{name}' ({vrc_group_id})...")
+    log.info("Updating group '%s' (%s)...", name, vrc_group_id)
 
     try:
-        response = requests.put(
-            endpoint,
-            headers=headers,
-            json=payload,
-            timeout=90
-        )
+        response = await website_client.put(endpoint, payload)
 
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
+        response_text = describe_response(response)
 
         if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Group updated.\n[Website Response] {response_text}")
+            log.info("Group updated.")
+            log.debug("[Website Response] %s", response_text)
+            GROUP_OPS.inc(op="update", outcome="ok")
+            return True
         else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+            GROUP_OPS.inc(op="update", outcome="failed")
 
     except Exception as ex:
-        print(f"{ts()} [Website] Error updating group: {ex}")
+        log.error("Error updating group: %s", ex)
+        GROUP_OPS.inc(op="update", outcome="failed")
+
+    return False
 
 
 async def delete_group_on_api(vrc_group_id: str):
     if not config.ENDPOINT_BASE_GROUP or not config.API_KEY:
-        print(f"{ts()} [Website] Skipping group deletion (no endpoint/API key).")
-        return
+        log.info("Skipping group deletion (no endpoint/API key).")
+        return False
 
     endpoint = f"{config.ENDPOINT_BASE_GROUP}/{vrc_group_id}"
 
-    headers = {
-        "x-api-key": config.API_KEY,
-        "user-agent": str(config.CONTACT),
-    }
-
-    print(f"{ts()} [Website] Deleting group {vrc_group_id}...")
+    log.info("Deleting group %s...", vrc_group_id)
 
     try:
-        response = requests.delete(endpoint, headers=headers, timeout=90)
+        response = await website_client.delete(endpoint)
 
-        try:
-            response_text = json.dumps(response.json(), indent=2)
-        except Exception:
-            response_text = response.text or "<no response body>"
+        response_text = describe_response(response)
 
         if response.status_code in (200, 201):
-            print(f"{ts()} [Website] Group deleted.\n[Website Response] {response_text}")
+            log.info("Group deleted.")
+            log.debug("[Website Response] %s", response_text)
+            GROUP_OPS.inc(op="delete", outcome="ok")
+            return True
         else:
-            print(f"{ts()} [Website] Failed ({response.status_code}): {response_text}")
+            log.warning("Failed (%s): %s", response.status_code, response_text)
+            GROUP_OPS.inc(op="delete", outcome="failed")
 
     except Exception as ex:
-        print(f"{ts()} [Website] Error deleting group: {ex}")
+        log.error("Error deleting group: %s", ex)
+        GROUP_OPS.inc(op="delete", outcome="failed")
+
+    return False
@@ -0,0 +1,161 @@
+import asyncio, signal, multiprocessing
+
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+from data.event import Event
+from data.sharding import HashRing
+from data.logger import get_logger, start_log_relay, setup_worker_logging
+import data.env_config as config
+
+
+config.FETCH_PROCESSES
+config.VRC_RATE
+
+
+log = get_logger("Workers")
+
+
+# settings a worker has to share with the bot; spawned workers re-read .env, but the
+# bot (or reload_env) may have changed these since
+SHARED_SETTINGS = (
+    "CONTACT", "VRC_ACCOUNTS", "DETAIL_CONCURRENCY", "RATE_LIMIT_RETRIES",
+    "CACHE_SIZE", "CALENDAR_CACHE_TTL", "DETAIL_CACHE_TTL", "GROUP_CACHE_TTL", "MEMBERSHIP_CACHE_TTL", "LOG_LEVEL",
+    "CALENDAR_PAGE_SIZE", "CALENDAR_HORIZON_DAYS",
+)
+
+
+# one single-process pool per worker, so a group always lands on the same process
+# and its calendar ETag and detail cache entries are there on the next sweep
+_pools = {}
+_ring = None
+_relay = None
+_log_queue = None
+_initargs = None
+
+
+# worker process state, set up by _init_worker
+_loop = None
+_vrchatapi = None
+
+
+def _init_worker(settings, hosts, log_queue):
+    global _loop, _vrchatapi
+    # Ctrl+C goes to the bot, which shuts the pool down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+    setup_worker_logging(log_queue, config.LOG_LEVEL)
+
+    # may already be imported: spawn re-runs the bot's main module (bot.py imports it), so
+    # rebuild the sessions and caches from the settings above instead of relying on import order
+    import data.vrchatapi as vrchatapi
+    vrchatapi.build_sessions()
+    vrchatapi.apply_cache_settings()
+    for session in vrchatapi.sessions:
+        session.configuration.host = hosts.get(session.name, session.configuration.host)
+        # a 401 is reported back; the bot refreshes the session and resends the group
+        session.refresh_on_401 = False
+
+    _vrchatapi = vrchatapi
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+
+def _fetch_in_worker(group_id, account, token, fresh):
+    session = _vrchatapi.sessions_by_name[account]
+    if token and token != _vrchatapi.auth_token(session):
+        _vrchatapi.set_auth_cookie(session, token)
+
+    events = _loop.run_until_complete(_vrchatapi.fetch_group_events(group_id, session, fresh))
+    compact = None if events is None else [e.compact() for e in events]
+    return compact, _vrchatapi.group_timings.get(group_id)
+
+
+def enabled():
+    return config.FETCH_PROCESSES > 0
+
+
+def _spawn(name):
+    # spawn everywhere: forking a process with running threads (logging, metrics) is unsafe
+    _pools[name] = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=_initargs,
+    )
+
+
+def start(hosts):
+    """
+    Start the worker processes, or replace any that died. `hosts` maps account name ->
+    VRChat API host.
+    """
+    global _ring, _relay, _log_queue, _initargs
+    if _ring is None:
+        processes = max(1, config.FETCH_PROCESSES)
+        if _relay is None:
+            _log_queue, _relay = start_log_relay(multiprocessing.get_context("spawn"))
+
+        settings = {name: getattr(config, name) for name in SHARED_SETTINGS}
+        # every process paces itself, so they split the per-account budget between them
+        settings["VRC_RATE"] = config.VRC_RATE / processes
+
+        _initargs = (settings, hosts, _log_queue)
+        _ring = HashRing([str(n) for n in range(processes)])
+        log.info("Starting %s fetch worker processes.", processes)
+
+    for name in _ring.nodes:
+        if name not in _pools:
+            _spawn(name)
+
+
+async def fetch_group_events(group_id, account, token, fresh=False):
+    """
+    Run fetch_group_events for `group_id` in its worker process as `account`.
+
+    Returns (events, timings); events is None when the fetch failed, like the in-process
+    version. The worker sends compact tuples back, which are turned into Events here.
+    """
+    name = _ring.owner(group_id) if _ring else None
+    pool = _pools.get(name)
+    if pool is None:
+        # that worker died earlier in this sweep; start() replaces it for the next one
+        return None, None
+
+    loop = asyncio.get_running_loop()
+    try:
+        compact, timings = await loop.run_in_executor(pool, _fetch_in_worker, group_id, account, token, fresh)
+    except BrokenProcessPool as ex:
+        if _pools.get(name) is pool:
+            log.error("Worker %s died while fetching %s (%s), restarting it next sweep.", name, group_id, ex)
+            pool.shutdown(wait=False, cancel_futures=True)
+            del _pools[name]
+        return None, None
+    except Exception as ex:
+        log.error("Worker failed to fetch %s: %s", group_id, ex)
+        return None, None
+
+    if compact is None:
+        return None, timings
+    return [Event.from_compact(group_id, data) for data in compact], timings
+
+
+def stop():
+    """Cancel queued fetches, wait for running ones and stop the worker processes."""
+    global _ring, _relay, _log_queue
+    if _pools:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        for pool in _pools.values():
+            pool.shutdown(wait=True)
+        _pools.clear()
+        log.info("Fetch worker processes stopped.")
+    _ring = None
+    if _relay is not None:
+        _relay.stop()
+        _relay = None
+        _log_queue = None
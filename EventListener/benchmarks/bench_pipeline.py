@@ -0,0 +1,125 @@
+"""
+Time-to-mirror benchmark for the VRChat pipeline listener.
+
+Syncs every group once, then creates events on the fake VRChat calendar one at a time,
+announces each over a fake pipeline websocket and measures how long it takes until the
+website receives it, and how many calendar calls that cost compared to a full sweep.
+
+    python benchmarks/bench_pipeline.py --groups 100 --updates 10
+"""
+import os, sys, time, asyncio, logging, argparse, tempfile
+
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+from bench_sweep import configure_bot, percentile
+from fake_servers import FakeVRChat, FakeWebsite
+from fake_pipeline import FakePipeline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--events", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--website-latency", type=float, default=0.02)
+    parser.add_argument("--debounce", type=float, default=0.2)
+    parser.add_argument("--vrc-rate", type=float, default=1000.0)
+    parser.add_argument("--website-rate", type=float, default=1000.0)
+    parser.add_argument("--no-bulk", action="store_true")
+    parser.add_argument("--list-details", action="store_true")
+    parser.add_argument("--fetch-concurrency", type=int, default=None)
+    parser.add_argument("--detail-concurrency", type=int, default=None)
+    parser.add_argument("--accounts", type=int, default=1, help="bot accounts sharing the groups")
+    parser.add_argument("--processes", type=int, default=0, help="fetch in this many worker processes")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--horizon-days", type=float, default=0, help="CALENDAR_HORIZON_DAYS")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+async def wait_for_create(website, event_id, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if any(p.get("vrc_event_id") == event_id for p in list(website.events.values())):
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def run(args):
+    vrchat = FakeVRChat(groups=args.groups, events_per_group=args.events, list_has_details=args.list_details, latency=args.latency).start()
+    website = FakeWebsite(bulk=not args.no_bulk, latency=args.website_latency).start()
+    pipeline = await FakePipeline().start()
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            vrchatapi = configure_bot(args, vrchat, website, workdir)
+            from data.pipeline import PipelineListener
+            from data.scheduler import scheduler
+
+            started = time.perf_counter()
+            await vrchatapi.fetch_vrc_events()
+            sweep_wall = time.perf_counter() - started
+            sweep_calls = sum(vrchat.log.snapshot()[0].values())
+
+            listener = PipelineListener(pipeline.url, args.debounce, token_provider=lambda: "benchmark")
+            task = asyncio.ensure_future(listener.run())
+            while not pipeline.clients:
+                await asyncio.sleep(0.01)
+
+            latencies, calls = [], []
+            for i in range(args.updates):
+                group_id = vrchat.group_ids[i % len(vrchat.group_ids)]
+                event = vrchat.add_event(group_id)
+                vrchat.log.reset()
+
+                sent = time.perf_counter()
+                await pipeline.group_event_created(group_id, event["id"])
+                if not await wait_for_create(website, event["id"]):
+                    print(f"  {event['id']} never reached the website")
+                    continue
+                latencies.append(time.perf_counter() - sent)
+                calls.append(sum(vrchat.log.snapshot()[0].values()))
+
+            relaxed = len(scheduler.push_groups)
+            await pipeline.drop_clients()
+            await asyncio.sleep(0.1)
+            fallback = not scheduler.push_groups
+
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            vrchatapi.get_event_store().close()
+    finally:
+        await pipeline.stop()
+        vrchat.stop()
+        website.stop()
+
+    print(f"groups={args.groups} events/group={args.events} vrchat latency={args.latency * 1000:.0f}ms debounce={args.debounce}s")
+    print(f"  full sweep: {sweep_wall:.2f}s, {sweep_calls} VRChat calls")
+    if latencies:
+        print(
+            f"  pipeline: {len(latencies)}/{args.updates} mirrored, time-to-mirror p50 {percentile(latencies, 50):.2f}s "
+            f"p99 {percentile(latencies, 99):.2f}s (includes {args.debounce}s debounce), "
+            f"{sum(calls) / len(calls):.1f} VRChat calls per update"
+        )
+    print(f"  polling relaxed while connected for {relaxed}/{args.groups} groups, back to normal polling after disconnect: {fallback}")
+
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        from data.logger import setup_logging
+        setup_logging()
+    else:
+        logging.disable(logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
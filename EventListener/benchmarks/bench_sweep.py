@@ -0,0 +1,250 @@
+"""
+Offline sweep benchmark.
+
+Runs fetch_vrc_events against local stand-ins for the VRChat API and the mirror website
+and reports wall time, request counts, upstream latency percentiles and peak RSS.
+
+    python benchmarks/bench_sweep.py --groups 150 --events 10 --latency 0.08
+    python benchmarks/bench_sweep.py --vrc-rate 5 --accounts 3
+    python benchmarks/bench_sweep.py --json baseline.json
+    python benchmarks/bench_sweep.py --compare baseline.json --max-regression 0.25
+"""
+import os, io, sys, json, time, asyncio, logging, argparse, tempfile, contextlib
+
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "EventListener")
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+from fake_servers import FakeVRChat, FakeWebsite
+
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--events", type=int, default=8, help="upcoming events per group")
+    parser.add_argument("--past-events", type=int, default=0, help="ended events per group, a month back")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--horizon-days", type=float, default=0, help="CALENDAR_HORIZON_DAYS")
+    parser.add_argument("--sweeps", type=int, default=3, help="first sweep is cold, later ones see --edit-fraction changes")
+    parser.add_argument("--edit-fraction", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05, help="VRChat stand-in latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of VRChat calls answered with 429")
+    parser.add_argument("--website-latency", type=float, default=0.02)
+    parser.add_argument("--website-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-bulk", action="store_true", help="website has no bulk route")
+    parser.add_argument("--list-details", action="store_true", help="calendar list already carries platforms/image/tags")
+    parser.add_argument("--vrc-rate", type=float, default=1000.0, help="per account")
+    parser.add_argument("--accounts", type=int, default=1, help="bot accounts sharing the groups")
+    parser.add_argument("--website-rate", type=float, default=1000.0)
+    parser.add_argument("--fetch-concurrency", type=int, default=None)
+    parser.add_argument("--detail-concurrency", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=0, help="fetch in this many worker processes")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare wall times against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output")
+    return parser.parse_args()
+
+
+def configure_bot(args, vrchat, website, workdir):
+    import data.env_config as config
+
+    config.GROUP_IDS = list(vrchat.group_ids)
+    config.ENDPOINT_BASE_EVENT = f"{website.base_url}/events"
+    config.ENDPOINT_BULK_EVENT = None if args.no_bulk else f"{website.base_url}/events/bulk"
+    config.API_KEY = "benchmark"
+    config.CONTACT = "EventListener-Benchmark/1.0"
+    config.VRC_RATE = args.vrc_rate
+    config.WEBSITE_RATE = args.website_rate
+    if args.fetch_concurrency:
+        config.FETCH_CONCURRENCY = args.fetch_concurrency
+    if args.detail_concurrency:
+        config.DETAIL_CONCURRENCY = args.detail_concurrency
+    config.FETCH_PROCESSES = args.processes
+    config.CALENDAR_PAGE_SIZE = args.page_size
+    config.CALENDAR_HORIZON_DAYS = args.horizon_days
+    config.CALENDAR_CACHE_TTL = 0  # the scheduler never polls a group inside the TTL
+    config.VRC_ACCOUNTS = [(str(n), f"bench{n}", "benchmark", None) for n in range(1, max(1, args.accounts) + 1)]
+
+    import vrchatapi as sdk
+    import data.vrchatapi as vrchatapi
+
+    # models validate against the default configuration; the stand-in user is not a full CurrentUser
+    relaxed = sdk.Configuration()
+    relaxed.client_side_validation = False
+    sdk.Configuration.set_default(relaxed)
+    import data.event_store as event_store
+    import data.outbox as outbox
+    import data.snapshot as snapshot
+    from data.ratelimit import limiter
+
+    for session in vrchatapi.sessions:
+        session.configuration.host = f"{vrchat.base_url}/api/1"
+        session.token_file = os.path.join(workdir, f"vrc_auth_token_{session.name}.json")
+    vrchatapi.calendar_cache.ttl = 0
+    limiter.default_rate = args.website_rate
+    limiter.buckets.clear()
+
+    event_store._store = event_store.SqliteEventStore(os.path.join(workdir, "events.db"))
+    outbox.outbox.path = os.path.join(workdir, "outbox.json")
+    outbox.outbox.dead_letter_path = os.path.join(workdir, "dead_letters.json")
+    outbox.outbox.items = {}
+    outbox.outbox.dead_letters = {}
+    snapshot.SNAPSHOT_FILE = os.path.join(workdir, "snapshot.json")
+
+    return vrchatapi
+
+
+def summarize(name, log):
+    counts, statuses, latencies = log.snapshot()
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "requests": sum(counts.values()),
+        "by_route": counts,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "p50_ms": round(percentile(every, 50) * 1000, 2) if every else None,
+        "p99_ms": round(percentile(every, 99) * 1000, 2) if every else None,
+    }
+
+
+async def run(args):
+    vrchat = FakeVRChat(
+        groups=args.groups,
+        events_per_group=args.events,
+        past_events=args.past_events,
+        list_has_details=args.list_details,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    ).start()
+    website = FakeWebsite(
+        bulk=not args.no_bulk,
+        latency=args.website_latency,
+        error_rate=args.website_error_rate,
+        seed=1,
+    ).start()
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            vrchatapi = configure_bot(args, vrchat, website, workdir)
+            await vrchatapi.login_all()
+
+            for sweep in range(args.sweeps):
+                if sweep:
+                    vrchat.edit_events(args.edit_fraction, seed=sweep)
+                vrchat.log.reset()
+                website.log.reset()
+                vrchatapi.group_timings.clear()
+
+                output = io.StringIO()
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                    await vrchatapi.fetch_vrc_events()
+                wall = time.perf_counter() - started
+
+                group_totals = [t["total"] for t in vrchatapi.group_timings.values() if t.get("total") is not None]
+                results.append({
+                    "sweep": sweep,
+                    "kind": "cold" if sweep == 0 else "incremental",
+                    "wall_s": round(wall, 3),
+                    "first_write_s": round(website.log.first_at - started, 3) if website.log.first_at else None,
+                    "group_p50_ms": round(percentile(group_totals, 50) * 1000, 2) if group_totals else None,
+                    "group_p99_ms": round(percentile(group_totals, 99) * 1000, 2) if group_totals else None,
+                    "vrchat": summarize("vrchat", vrchat.log),
+                    "website": summarize("website", website.log),
+                    "peak_rss_mb": round(peak_rss_mb(), 1) if resource else None,
+                })
+
+            vrchatapi.workers.stop()
+            vrchatapi.get_event_store().close()
+    finally:
+        vrchat.stop()
+        website.stop()
+
+    return results
+
+
+def _show(value, unit):
+    return "-" if value is None else f"{value}{unit}"
+
+
+def print_report(args, results):
+    print(f"groups={args.groups} events/group={args.events} accounts={args.accounts} processes={args.processes} vrchat latency={args.latency * 1000:.0f}ms "
+          f"website latency={args.website_latency * 1000:.0f}ms bulk={'no' if args.no_bulk else 'yes'}")
+    for r in results:
+        vrc, web = r["vrchat"], r["website"]
+        print(
+            f"  sweep {r['sweep']} ({r['kind']}): {r['wall_s']:.2f}s wall, first website write {_show(r['first_write_s'], 's')} | "
+            f"group p50 {_show(r['group_p50_ms'], 'ms')} p99 {_show(r['group_p99_ms'], 'ms')} | "
+            f"vrchat {vrc['requests']} req p50 {_show(vrc['p50_ms'], 'ms')} p99 {_show(vrc['p99_ms'], 'ms')} | "
+            f"website {web['requests']} req p50 {_show(web['p50_ms'], 'ms')} p99 {_show(web['p99_ms'], 'ms')} | "
+            f"peak RSS {_show(r['peak_rss_mb'], ' MB')}"
+        )
+        print(f"    vrchat routes: {vrc['by_route']}  website routes: {web['by_route']}")
+
+
+def compare(results, baseline_path, max_regression):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["sweep"]: r for r in json.load(f)["results"]}
+
+    regressed = False
+    for r in results:
+        base = baseline.get(r["sweep"])
+        if not base:
+            continue
+        ratio = r["wall_s"] / base["wall_s"] if base["wall_s"] else 1.0
+        flag = "REGRESSION" if ratio > 1 + max_regression else "ok"
+        regressed |= flag != "ok"
+        print(f"  sweep {r['sweep']}: {base['wall_s']:.2f}s -> {r['wall_s']:.2f}s ({ratio:.2f}x) {flag}")
+    return regressed
+
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        from data.logger import setup_logging
+        setup_logging()
+    else:
+        logging.disable(logging.CRITICAL)
+
+    results = asyncio.run(run(args))
+    print_report(args, results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
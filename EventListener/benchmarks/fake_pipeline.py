@@ -0,0 +1,54 @@
+"""Local stand-in for wss://pipeline.vrchat.cloud. Needs the optional websockets package (>= 14)."""
+import json
+
+
+from websockets.asyncio.server import serve
+
+
+class FakePipeline:
+    """Accepts any authToken and lets the benchmark push frames to every connected client."""
+
+    def __init__(self):
+        self.server = None
+        self.clients = set()
+        self.tokens = []
+
+    @property
+    def url(self):
+        host, port = list(self.server.sockets)[0].getsockname()[:2]
+        return f"ws://{host}:{port}/"
+
+    async def _handler(self, ws):
+        self.tokens.append(ws.request.path)
+        self.clients.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.clients.discard(ws)
+
+    async def start(self):
+        self.server = await serve(self._handler, "127.0.0.1", 0)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def drop_clients(self):
+        for ws in list(self.clients):
+            await ws.close()
+
+    async def send(self, kind, content):
+        """Send one frame shaped like VRChat's: content is itself a JSON string."""
+        frame = json.dumps({"type": kind, "content": json.dumps(content)})
+        for ws in list(self.clients):
+            await ws.send(frame)
+
+    async def group_event_created(self, group_id, event_id):
+        await self.send("notification-v2", {
+            "id": f"not_{event_id}",
+            "type": "group.event.created",
+            "senderUserId": group_id,
+            "link": f"event:{group_id}:{event_id}",
+            "data": {"groupId": group_id, "eventId": event_id},
+        })
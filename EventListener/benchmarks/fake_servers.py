@@ -0,0 +1,309 @@
+import json, time, random, threading
+
+
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class RequestLog:
+    """Thread-safe per-route request counts and service times (including injected latency)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.statuses = {}
+        self.latencies = {}
+        self.first_at = None
+
+    def record(self, route, status, seconds):
+        with self.lock:
+            if self.first_at is None:
+                self.first_at = time.perf_counter()
+            self.counts[route] = self.counts.get(route, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.latencies.setdefault(route, []).append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.statuses.clear()
+            self.latencies.clear()
+            self.first_at = None
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts), dict(self.statuses), {k: list(v) for k, v in self.latencies.items()}
+
+
+class FakeServer:
+    """
+    Base for the stand-in servers: latency, error rate and 429 rate are set per instance.
+
+    Subclasses implement route(method, path, query, body) -> (route_name, status, payload).
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.log = RequestLog()
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, method, path, query, body):
+        raise NotImplementedError
+
+    def _handle(self, handler, method):
+        started = time.perf_counter()
+        parts = urlsplit(handler.path)
+        length = int(handler.headers.get("content-length") or 0)
+        raw = handler.rfile.read(length) if length else b""
+        body = json.loads(raw) if raw else None
+
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        if delay:
+            time.sleep(delay)
+
+        roll = self.random.random()
+        headers = {}
+        if roll < self.throttle_rate:
+            route, status, payload = "throttled", 429, {"error": {"message": "slow down", "status_code": 429}}
+            headers["Retry-After"] = "1"
+        elif roll < self.throttle_rate + self.error_rate:
+            route, status, payload = "error", 500, {"error": {"message": "injected failure", "status_code": 500}}
+        else:
+            route, status, payload = self.route(method, parts.path, parse_qs(parts.query), body)
+
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("content-type", "application/json")
+        handler.send_header("content-length", str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+        self.log.record(route, status, time.perf_counter() - started)
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+            def do_PUT(self):
+                server._handle(self, "PUT")
+
+            def do_DELETE(self):
+                server._handle(self, "DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+class FakeVRChat(FakeServer):
+    """Calendar / group / member endpoints of api.vrchat.cloud/api/1 for `groups` groups."""
+
+    def __init__(self, groups=10, events_per_group=5, list_has_details=False, past_events=0, **kwargs):
+        super().__init__(**kwargs)
+        self.list_has_details = list_has_details
+        self.group_ids = [f"grp_{i:08d}-0000-0000-0000-000000000000" for i in range(groups)]
+        now = datetime.now(timezone.utc)
+        # listed in start order like VRChat does; past events sit in earlier months
+        self.events = {
+            gid: [self._event(gid, -1 - i, now - timedelta(days=40)) for i in reversed(range(past_events))]
+            + [self._event(gid, i, now) for i in range(events_per_group)]
+            for gid in self.group_ids
+        }
+        self.session_valid = True
+
+    def expire_session(self):
+        """Answer 401 to everything but the login route until the bot logs in again."""
+        self.session_valid = False
+
+    def _event(self, group_id, i, now):
+        start = now + timedelta(hours=1 + i)
+        return {
+            "id": f"cal_{group_id[4:12]}_{i:05d}",
+            "ownerId": group_id,
+            "title": f"Event {i}",
+            "description": "Benchmark event",
+            "startsAt": _iso(start),
+            "endsAt": _iso(start + timedelta(hours=2)),
+            "updatedAt": _iso(now),
+            "category": "hangout",
+            "accessType": "public",
+            "platforms": ["standalonewindows", "android"],
+            "imageUrl": None,
+            "tags": ["benchmark"],
+        }
+
+    def add_event(self, group_id):
+        """Create one new event in `group_id` and return it."""
+        events = self.events[group_id]
+        event = self._event(group_id, len(events), datetime.now(timezone.utc))
+        events.append(event)
+        return event
+
+    def edit_events(self, fraction, seed=1):
+        """Retitle a fraction of all events so the next sweep sees changes."""
+        rng = random.Random(seed)
+        now = _iso(datetime.now(timezone.utc))
+        for events in self.events.values():
+            for e in events:
+                if rng.random() < fraction:
+                    e["title"] += " (edited)"
+                    e["updatedAt"] = now
+
+    def _list_item(self, e):
+        if self.list_has_details:
+            return e
+        return {k: v for k, v in e.items() if k not in ("platforms", "imageUrl", "tags")}
+
+    def route(self, method, path, query, body):
+        parts = [p for p in path.split("/") if p][2:]  # drop api/1
+
+        if parts[:2] == ["auth", "user"]:
+            self.session_valid = True
+            return "auth", 200, {"id": "usr_bench", "displayName": "Benchmark Bot"}
+
+        if not self.session_valid:
+            return "unauthorized", 401, {"error": {"message": "Missing Credentials", "status_code": 401}}
+
+        if parts and parts[0] == "calendar" and len(parts) == 2:
+            events = self.events.get(parts[1])
+            if events is None:
+                return "calendar_list", 404, {"error": {"message": "not found", "status_code": 404}}
+            month = query.get("date", [None])[0]
+            if month:
+                events = [e for e in events if e["startsAt"][:7] == month[:7]]
+            n = int(query.get("n", ["100"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            page = events[offset:offset + n]
+            return "calendar_list", 200, {
+                "results": [self._list_item(e) for e in page],
+                "totalCount": len(events),
+                "hasNext": offset + n < len(events),
+            }
+
+        if parts and parts[0] == "calendar" and len(parts) == 3:
+            for e in self.events.get(parts[1], []):
+                if e["id"] == parts[2]:
+                    return "calendar_event", 200, e
+            return "calendar_event", 404, {"error": {"message": "not found", "status_code": 404}}
+
+        if parts and parts[0] == "groups" and len(parts) == 2:
+            return "group", 200, {"id": parts[1], "name": f"Group {parts[1][4:12]}"}
+
+        if parts and parts[0] == "users" and len(parts) == 3 and parts[2] == "groups":
+            return "user_groups", 200, [
+                {"id": f"gmem_{gid[4:12]}", "groupId": gid, "name": f"Group {gid[4:12]}"} for gid in self.group_ids
+            ]
+
+        if parts and parts[0] == "groups" and len(parts) == 4 and parts[2] == "members":
+            return "group_member", 200, {"groupId": parts[1], "userId": parts[3]}
+
+        return "unknown", 404, {"error": {"message": f"no route for {path}", "status_code": 404}}
+
+
+class FakeWebsite(FakeServer):
+    """Event and group endpoints of the mirror website, with an optional bulk route."""
+
+    def __init__(self, bulk=True, page_size=50, **kwargs):
+        super().__init__(**kwargs)
+        self.bulk = bulk
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.events = {}
+        self.groups = {}
+
+    def _create(self, payload):
+        with self.lock:
+            website_id = str(self.next_id)
+            self.next_id += 1
+            self.events[website_id] = payload
+        return {"id": website_id, "vrc_group_id": payload["vrc_group_id"], "vrc_event_id": payload["vrc_event_id"], "status": 201}
+
+    def route(self, method, path, query, body):
+        parts = [p for p in path.split("/") if p]
+
+        if parts == ["events", "bulk"] and method == "POST":
+            if not self.bulk:
+                return "bulk", 404, {"error": "no bulk route"}
+            return "bulk", 200, {"results": [self._create(p) for p in body.get("events", [])]}
+
+        if parts == ["events"] and method == "GET":
+            offset = int(query.get("offset", ["0"])[0])
+            with self.lock:
+                listed = [dict(payload, id=website_id) for website_id, payload in self.events.items()]
+            page = listed[offset:offset + self.page_size]
+            more = offset + self.page_size < len(listed)
+            return "list_events", 200, {
+                "results": page,
+                "count": len(listed),
+                "next": f"/events?offset={offset + self.page_size}" if more else None,
+            }
+
+        if parts == ["events"] and method == "POST":
+            return "create", 201, self._create(body)
+
+        if len(parts) == 2 and parts[0] == "events":
+            with self.lock:
+                exists = parts[1] in self.events
+                if method == "PUT" and exists:
+                    self.events[parts[1]] = body
+                elif method == "DELETE" and exists:
+                    del self.events[parts[1]]
+            route = "update" if method == "PUT" else "delete"
+            return route, 200 if exists else 404, {"id": parts[1]}
+
+        if parts == ["groups"] and method == "GET":
+            with self.lock:
+                return "list_groups", 200, [{"vrc_group_id": gid, "name": name} for gid, name in self.groups.items()]
+
+        if parts == ["groups"] and method == "POST":
+            with self.lock:
+                self.groups[body["vrc_group_id"]] = body["name"]
+            return "create_group", 201, body
+
+        if len(parts) == 2 and parts[0] == "groups":
+            with self.lock:
+                exists = parts[1] in self.groups
+                if method == "PUT" and exists:
+                    self.groups[parts[1]] = body["name"]
+                elif method == "DELETE" and exists:
+                    del self.groups[parts[1]]
+            route = "update_group" if method == "PUT" else "delete_group"
+            return route, 200 if exists else 404, {"vrc_group_id": parts[1]}
+
+        return "unknown", 404, {"error": f"no route for {method} {path}"}